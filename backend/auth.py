@@ -1,29 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event
 from sqlalchemy.orm import Session
-from database import get_db
+from database import AsyncDB, get_async_db
 from models import Farmer
 from schemas import FarmerCreate, FarmerLogin, Token, FarmerResponse
+from services.cache import TTLCache
+import asyncio
 import os
+import secrets
+import time
 
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Shared key for operator endpoints (bulk imports); unset disables them
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt work factor; each +1 doubles hashing cost
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so a small thread pool hashes in parallel
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Threads hashing CSV imports, kept apart from the interactive pool above
+BULK_PASSWORD_HASH_WORKERS = int(os.getenv("BULK_PASSWORD_HASH_WORKERS", "1"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 security = HTTPBearer()
 
+# Dedicated pool so a login burst cannot starve the default threadpool or
+# block the event loop
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+# Bulk imports queue hundreds of hashes at once; on their own pool they
+# cannot hold up logins and registrations
+_bulk_password_executor = ThreadPoolExecutor(
+    max_workers=BULK_PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash-bulk"
+)
+
+# Short-lived caches so authenticated requests skip the JWT decode and the
+# farmer lookup. Entries are dropped when a farmer row is updated or
+# deleted in this process; the TTL bounds staleness across workers.
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+_token_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL, name="auth_tokens")
+_principal_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL, name="auth_principals")
+
+@dataclass(frozen=True)
+class FarmerPrincipal:
+    """Detached, read-only snapshot of the authenticated farmer"""
+    id: int
+    name: str
+    email: str
+    phone: str
+    location: str
+    state: str
+    district: str
+    village: Optional[str]
+    is_active: bool
+    created_at: datetime
+
+    @classmethod
+    def from_farmer(cls, farmer: Farmer) -> "FarmerPrincipal":
+        return cls(
+            id=farmer.id,
+            name=farmer.name,
+            email=farmer.email,
+            phone=farmer.phone,
+            location=farmer.location,
+            state=farmer.state,
+            district=farmer.district,
+            village=farmer.village,
+            is_active=farmer.is_active,
+            created_at=farmer.created_at,
+        )
+
+def invalidate_farmer(farmer_id: int):
+    _principal_cache.delete(int(farmer_id))
+
+@event.listens_for(Farmer, "after_update")
+@event.listens_for(Farmer, "after_delete")
+def _invalidate_cached_farmer(mapper, connection, target):
+    invalidate_farmer(target.id)
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password, hashed_password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, get_password_hash, password)
+
+async def get_password_hashes_bulk(passwords: List[str]) -> List[str]:
+    """Hash many passwords on the bulk pool (CSV imports)"""
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(
+        *(loop.run_in_executor(_bulk_password_executor, get_password_hash, password) for password in passwords)
+    )
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -40,18 +125,42 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    token = credentials.credentials
+    farmer_id = _token_cache.get(token)
+    if farmer_id is not None:
+        return farmer_id
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         farmer_id: int = payload.get("sub")
         if farmer_id is None:
             raise credentials_exception
+        # Never cache a token past its own expiry
+        ttl = min(AUTH_CACHE_TTL, payload.get("exp", 0) - time.time())
+        if ttl > 0:
+            _token_cache.set(token, farmer_id, ttl=ttl)
         return farmer_id
     except JWTError:
         raise credentials_exception
 
-def get_current_farmer(farmer_id: int = Depends(verify_token), db: Session = Depends(get_db)):
+def _load_principal(db: Session, farmer_id: int) -> Optional[FarmerPrincipal]:
     farmer = db.query(Farmer).filter(Farmer.id == farmer_id).first()
+    return FarmerPrincipal.from_farmer(farmer) if farmer is not None else None
+
+async def get_current_farmer(farmer_id: int = Depends(verify_token), db: AsyncDB = Depends(get_async_db)):
+    farmer_id = int(farmer_id)
+    farmer = _principal_cache.get(farmer_id)
     if farmer is None:
-        raise HTTPException(status_code=404, detail="Farmer not found")
+        farmer = await db.run(_load_principal, farmer_id)
+        if farmer is None:
+            raise HTTPException(status_code=404, detail="Farmer not found")
+        _principal_cache.set(farmer_id, farmer)
     return farmer
 
+def is_admin_key(key: Optional[str]) -> bool:
+    return bool(ADMIN_API_KEY and key and secrets.compare_digest(key, ADMIN_API_KEY))
+
+def require_admin(x_admin_key: Optional[str] = Header(None)):
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    if not is_admin_key(x_admin_key):
+        raise HTTPException(status_code=403, detail="Invalid admin key")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark.
+
+Drives concurrent POST /api/auth/login requests against the app in-process
+while probing /health on the same event loop. Health latency shows how much
+password hashing stalls unrelated endpoints. Run from the backend directory:
+    python -m benchmarks.login_throughput --concurrency 32 --duration 10
+    BCRYPT_ROUNDS=10 PASSWORD_HASH_WORKERS=8 python -m benchmarks.login_throughput
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--farmers', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run')
+    return parser.parse_args()
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def _seed_farmers(count: int):
+    from sqlalchemy import insert
+    from auth import get_password_hash
+    from database import engine
+    from models import Farmer
+
+    hashed = get_password_hash('password')
+    with engine.begin() as conn:
+        conn.execute(insert(Farmer), [{
+            'name': f'Farmer {i}', 'email': f'farmer{i}@example.com', 'phone': f'9{i:09d}',
+            'location': 'Guntur', 'state': 'Andhra Pradesh', 'district': 'Guntur',
+            'hashed_password': hashed, 'is_active': True,
+        } for i in range(count)])
+
+
+async def _run(args):
+    import httpx
+    import main
+
+    login_latencies, health_latencies = [], []
+    errors = 0
+    deadline = time.perf_counter() + args.duration
+
+    async with httpx.AsyncClient(app=main.app, base_url='http://bench') as client:
+        async def login_worker(worker: int):
+            nonlocal errors
+            i = worker
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                r = await client.post('/api/auth/login', json={
+                    'email': f'farmer{i % args.farmers}@example.com', 'password': 'password'})
+                login_latencies.append(time.perf_counter() - t0)
+                errors += r.status_code != 200
+                i += args.concurrency
+
+        async def health_probe():
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                await client.get('/health')
+                health_latencies.append(time.perf_counter() - t0)
+                await asyncio.sleep(0.05)
+
+        started = time.perf_counter()
+        await asyncio.gather(health_probe(), *(login_worker(w) for w in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"bcrypt rounds={os.getenv('BCRYPT_ROUNDS', '12')} "
+          f"hash workers={os.getenv('PASSWORD_HASH_WORKERS', 'default')} concurrency={args.concurrency}")
+    print(f"logins: {len(login_latencies)} in {elapsed:.1f}s = {len(login_latencies) / elapsed:.1f}/s, errors {errors}")
+    print(f"login latency ms: p50 {_percentile(login_latencies, 50) * 1000:.1f} "
+          f"p95 {_percentile(login_latencies, 95) * 1000:.1f} p99 {_percentile(login_latencies, 99) * 1000:.1f}")
+    print(f"/health latency ms during burst: median {statistics.median(health_latencies) * 1000:.1f} "
+          f"p95 {_percentile(health_latencies, 95) * 1000:.1f} max {max(health_latencies) * 1000:.1f}")
+
+
+def main():
+    args = _parse_args()
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mktemp(suffix='.db')}")
+    from database import engine
+    from models import Base
+
+    Base.metadata.create_all(bind=engine)
+    _seed_farmers(args.farmers)
+    asyncio.run(_run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Query-plan benchmark for market price lookups.
+
+Seeds a scratch database with synthetic MarketData and compares the legacy
+``ilike`` scan with the ``(crop_key, date DESC)`` index and the summary
+table. Run from the backend directory:
+    python -m benchmarks.market_query_plan --rows 200000
+    python -m benchmarks.market_query_plan --database-url postgresql://... --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+CROPS = ['Rice', 'Wheat', 'Maize', 'Cotton', 'Onion', 'Tomato', 'Sugarcane', 'Millets',
+         'Groundnut', 'Soyabean', 'Bajra', 'Jowar', 'Ragi', 'Potato', 'Chilli']
+MARKETS = ['Guntur', 'Vijayawada', 'Kurnool', 'Warangal', 'Nizamabad', 'Bangalore', 'Mysore']
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--crop', default='Onion')
+    parser.add_argument('--database-url', default=None,
+                        help='Scratch database to use (default: temporary SQLite file)')
+    return parser.parse_args()
+
+
+def _seed(engine, rows: int):
+    from sqlalchemy import insert
+    from models import MarketData, normalize_crop_key
+
+    start = datetime(2023, 1, 1)
+    batch = []
+    for i in range(rows):
+        crop = random.choice(CROPS)
+        batch.append({
+            'crop_name': crop,
+            'crop_key': normalize_crop_key(crop),
+            'market_name': f"{random.choice(MARKETS)} Market",
+            'location': 'AP',
+            'price_per_kg': round(random.uniform(5, 80), 2),
+            'date': start + timedelta(minutes=i),
+            'quality_grade': random.choice(['A', 'B', 'C']),
+        })
+        if len(batch) == 10000:
+            with engine.begin() as conn:
+                conn.execute(insert(MarketData), batch)
+            batch = []
+    if batch:
+        with engine.begin() as conn:
+            conn.execute(insert(MarketData), batch)
+
+
+def _explain(conn, sql: str, params: dict):
+    from sqlalchemy import text
+
+    prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN ANALYZE '
+    return [' | '.join(str(col) for col in row) for row in conn.execute(text(prefix + sql), params)]
+
+
+def _time(conn, sql: str, params: dict, repeat: int):
+    from sqlalchemy import text
+
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    args = _parse_args()
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{tempfile.mktemp(suffix='.db')}"
+    os.environ['DATABASE_URL'] = args.database_url
+
+    from database import SessionLocal, engine
+    from models import Base, normalize_crop_key
+    from migrations import run_migrations
+    from services.market_summary import refresh_price_summaries
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    print(f"Seeding {args.rows} market rows into {engine.url.render_as_string(hide_password=True)}")
+    t0 = time.perf_counter()
+    _seed(engine, args.rows)
+    print(f"Seeded in {time.perf_counter() - t0:.1f}s")
+
+    db = SessionLocal()
+    try:
+        refresh_price_summaries(db)
+        db.commit()
+    finally:
+        db.close()
+
+    queries = {
+        'legacy ilike scan': (
+            "SELECT * FROM market_data WHERE lower(crop_name) LIKE lower(:pattern) "
+            "ORDER BY date DESC LIMIT 10",
+            {'pattern': f"%{args.crop}%"},
+        ),
+        'crop_key index': (
+            "SELECT * FROM market_data WHERE crop_key = :crop_key ORDER BY date DESC LIMIT 10",
+            {'crop_key': normalize_crop_key(args.crop)},
+        ),
+        'summary lookup': (
+            "SELECT * FROM market_price_summaries WHERE crop_key = :crop_key",
+            {'crop_key': normalize_crop_key(args.crop)},
+        ),
+    }
+    with engine.connect() as conn:
+        for name, (sql, params) in queries.items():
+            median_ms, max_ms = _time(conn, sql, params, args.repeat)
+            print(f"\n== {name}: median {median_ms:.3f} ms, max {max_ms:.3f} ms")
+            for line in _explain(conn, sql, params):
+                print(f"   {line}")
+
+
+if __name__ == '__main__':
+    main()
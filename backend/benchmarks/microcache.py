@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+nginx microcache load test.
+
+Sends concurrent GETs for the public endpoints (market prices, trends, FAQ)
+to a running deployment and counts nginx's X-Cache-Status header: HIT,
+STALE and UPDATING responses were served from the cache, everything else
+reached the app. Run once against nginx and once against the app directly
+to see how many requests per second the backend is spared:
+    python -m benchmarks.microcache --url http://localhost --concurrency 64 --duration 30
+    python -m benchmarks.microcache --url http://localhost:8000 --concurrency 64 --duration 30
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+from collections import Counter
+
+CACHED_STATUSES = {'HIT', 'STALE', 'UPDATING', 'REVALIDATED'}
+
+COMMODITIES = ('rice', 'wheat', 'maize', 'cotton', 'sugarcane', 'soybean', 'groundnut', 'pulses')
+QUESTIONS = (
+    'when to sow wheat', 'how much urea for rice', 'best crop for black soil',
+    'how to control aphids', 'when to irrigate cotton',
+)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost', help='nginx (or app) base URL')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run')
+    return parser.parse_args()
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def _paths():
+    paths = [f'/api/market/{commodity}' for commodity in COMMODITIES]
+    paths += ['/api/trends'] * 4
+    paths += [f'/api/faq?question={question.replace(" ", "+")}' for question in QUESTIONS]
+    return itertools.cycle(paths)
+
+
+async def _run(args):
+    import httpx
+
+    statuses, latencies = Counter(), []
+    errors = 0
+    paths = _paths()
+    deadline = time.perf_counter() + args.duration
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=10.0) as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(next(paths))
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+                statuses[response.headers.get('x-cache-status', 'NONE')] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    total = sum(statuses.values())
+    upstream = sum(count for status, count in statuses.items() if status not in CACHED_STATUSES)
+    print(f"requests: {total} in {elapsed:.1f}s, errors: {errors}")
+    print(f"client rps: {total / elapsed:.0f}, backend rps: {upstream / elapsed:.0f} "
+          f"({100.0 * upstream / max(total, 1):.1f}% of requests reached the app)")
+    print("cache status: " + ", ".join(f"{status}={count}" for status, count in statuses.most_common()))
+    print(f"latency ms p50={_percentile(latencies, 50) * 1000:.1f} "
+          f"p95={_percentile(latencies, 95) * 1000:.1f} p99={_percentile(latencies, 99) * 1000:.1f}")
+
+
+def main():
+    asyncio.run(_run(_parse_args()))
+
+
+if __name__ == '__main__':
+    main()
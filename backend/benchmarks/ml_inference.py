@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+MLService inference benchmark.
+
+Trains synthetic models on MLService._create_sample_data (XGBoost like
+backend/ml when installed, otherwise random forests), saves them to a temp
+directory and measures, through MLService itself:
+  - model load time, file size and memory held per model
+  - cold (first call after load) vs warm get_crop_recommendations latency
+  - get_crop_recommendations_batch latency and rows/s per batch size
+  - detect_pest_disease latency (small synthetic CNNs when TensorFlow and
+    Pillow are installed, otherwise the heuristic fallback)
+Runs offline. Results are written as JSON; pass an earlier file as
+--baseline to flag regressions. Run from the backend directory:
+    python -m benchmarks.ml_inference --batch-sizes 1 8 64 512 --output ml_bench.json
+    python -m benchmarks.ml_inference --baseline ml_bench.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+from services.ml_service import MLService, tf
+
+# Model attribute -> file written by the training step
+SERIALIZED_MODELS = {
+    'crop_model': 'crop_model.pkl',
+    'yield_model': 'yield_model.pkl',
+    'scaler': 'scaler.pkl',
+    'fertilizer_model': 'fertilizer_model.pkl',
+    'fertilizer_scaler': 'fertilizer_scaler.pkl',
+    'disease_model': 'disease_model.h5',
+    'pest_model': 'pest_model.h5',
+}
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32, 128, 512])
+    parser.add_argument('--repeat', type=int, default=30, help='Timed calls per measurement')
+    parser.add_argument('--estimator', choices=('auto', 'xgboost', 'random_forest'), default='auto')
+    parser.add_argument('--cnn-classes', type=int, default=10)
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--baseline', help='Earlier results to compare against')
+    parser.add_argument('--tolerance', type=float, default=1.2, help='Slowdown ratio reported as a regression')
+    parser.add_argument('--min-ms', type=float, default=5.0, help='Ignore measurements below this in comparisons')
+    return parser.parse_args()
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def _summary(seconds):
+    return {
+        'p50_ms': round(_percentile(seconds, 50) * 1000, 3),
+        'p95_ms': round(_percentile(seconds, 95) * 1000, 3),
+        'mean_ms': round(statistics.mean(seconds) * 1000, 3),
+    }
+
+
+def _time_calls(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _estimators(kind):
+    if kind in ('auto', 'xgboost'):
+        try:
+            from xgboost import XGBClassifier, XGBRegressor
+
+            # Same settings as backend/ml/train_*_model.py
+            params = dict(max_depth=6, learning_rate=0.05, subsample=0.9, colsample_bytree=0.9)
+            return 'xgboost', (lambda: XGBClassifier(n_estimators=300, eval_metric='mlogloss', **params),
+                               lambda: XGBRegressor(n_estimators=400, **params))
+        except ImportError:
+            if kind == 'xgboost':
+                raise SystemExit("xgboost is not installed")
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+    return 'random_forest', (lambda: RandomForestClassifier(n_estimators=100, n_jobs=1),
+                             lambda: RandomForestRegressor(n_estimators=100, n_jobs=1))
+
+
+def _build_cnn(num_classes):
+    """Untrained copy of the architecture in backend/ml/train_disease_model.py"""
+    from tensorflow.keras import layers, models
+
+    model = models.Sequential([
+        layers.Input(shape=(224, 224, 3)),
+        layers.Rescaling(1. / 255),
+        layers.Conv2D(32, 3, activation='relu'),
+        layers.MaxPooling2D(),
+        layers.Conv2D(64, 3, activation='relu'),
+        layers.MaxPooling2D(),
+        layers.Conv2D(128, 3, activation='relu'),
+        layers.GlobalAveragePooling2D(),
+        layers.Dropout(0.2),
+        layers.Dense(num_classes, activation='softmax'),
+    ])
+    model.compile(optimizer='adam', loss='sparse_categorical_crossentropy')
+    return model
+
+
+def _train_models(models_path, estimator, cnn_classes):
+    """Fit synthetic models and save them where MLService looks for them"""
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+    name, (classifier, regressor) = _estimators(estimator)
+    df = MLService(models_path=models_path)._create_sample_data()
+    X = df.drop(columns=['crop', 'yield', 'fertilizer']).values
+    timings = {}
+
+    started = time.perf_counter()
+    scaler = StandardScaler().fit(X)
+    crop_labels = LabelEncoder().fit(df['crop'])
+    crop_model = classifier().fit(scaler.transform(X), crop_labels.transform(df['crop']))
+    timings['crop_model'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    yield_model = regressor().fit(scaler.transform(X), df['yield'])
+    timings['yield_model'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fertilizer_scaler = StandardScaler().fit(X[:, :5])
+    fertilizer_labels = LabelEncoder().fit(df['fertilizer'])
+    fertilizer_model = classifier().fit(fertilizer_scaler.transform(X[:, :5]), fertilizer_labels.transform(df['fertilizer']))
+    timings['fertilizer_model'] = time.perf_counter() - started
+
+    for attribute, model in (('crop_model', crop_model), ('yield_model', yield_model), ('scaler', scaler),
+                             ('fertilizer_model', fertilizer_model), ('fertilizer_scaler', fertilizer_scaler)):
+        joblib.dump(model, os.path.join(models_path, SERIALIZED_MODELS[attribute]))
+
+    if tf is not None:
+        for attribute in ('disease_model', 'pest_model'):
+            _build_cnn(cnn_classes).save(os.path.join(models_path, SERIALIZED_MODELS[attribute]))
+    return name, {key: round(value, 3) for key, value in timings.items()}
+
+
+def _rss_bytes():
+    """Resident set size (Linux only)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _load_model_file(path):
+    """Load one model file; runs in a fresh process so memory and time are not
+    skewed by the training done in this one"""
+    rss_before = _rss_bytes()
+    tracemalloc.start()
+    started = time.perf_counter()
+    if path.endswith('.h5'):
+        model = tf.keras.models.load_model(path)
+    else:
+        model = joblib.load(path)
+    load_seconds = time.perf_counter() - started
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = _rss_bytes()
+    del model
+    return {
+        'load_ms': round(load_seconds * 1000, 2),
+        'file_bytes': os.path.getsize(path),
+        # Allocations made through Python/numpy; native buffers (sklearn trees, TF) only show in the RSS delta
+        'traced_bytes': traced,
+        'rss_delta_bytes': rss_after - rss_before if rss_before is not None else None,
+    }
+
+
+def _measure_loading(models_path):
+    """Per-file load time and memory, then a full MLService construction"""
+    models = {}
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        for attribute, filename in SERIALIZED_MODELS.items():
+            path = os.path.join(models_path, filename)
+            if os.path.exists(path):
+                models[attribute] = pool.apply(_load_model_file, (path,))
+
+    started = time.perf_counter()
+    service = MLService(models_path=models_path)
+    return service, models, round((time.perf_counter() - started) * 1000, 2)
+
+
+def _synthetic_inputs(count, seed=0):
+    rng = np.random.default_rng(seed)
+    seasons = ('kharif', 'rabi', 'summer')
+    states = ('andhra_pradesh', 'telangana', 'karnataka', 'tamil_nadu', 'kerala')
+    return [(
+        {'ph': float(rng.normal(6.5, 1.0)), 'nitrogen': float(rng.normal(50, 20)),
+         'phosphorus': float(rng.normal(30, 15)), 'potassium': float(rng.normal(40, 18)),
+         'organic_matter': float(rng.normal(2.5, 1.0))},
+        {'temperature': float(rng.normal(25, 5)), 'rainfall': float(rng.normal(1000, 300)),
+         'humidity': float(rng.normal(70, 15))},
+        seasons[i % 3], states[i % 5],
+    ) for i in range(count)]
+
+
+def _bench_recommendations(service, batch_sizes, repeat):
+    single = _synthetic_inputs(1)[0]
+    started = time.perf_counter()
+    service.get_crop_recommendations(*single)
+    cold = time.perf_counter() - started
+    warm = _time_calls(lambda: service.get_crop_recommendations(*single), repeat)
+    results = {'cold_ms': round(cold * 1000, 3), 'warm': _summary(warm), 'batches': {}}
+
+    for size in batch_sizes:
+        inputs = _synthetic_inputs(size, seed=size)
+        samples = _time_calls(lambda: service.get_crop_recommendations_batch(inputs), repeat)
+        results['batches'][str(size)] = dict(
+            _summary(samples), rows_per_second=round(size / statistics.median(samples), 1)
+        )
+    return results
+
+
+def _write_test_image(directory):
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    path = os.path.join(directory, 'leaf.jpg')
+    pixels = (np.random.default_rng(0).random((224, 224, 3)) * 255).astype('uint8')
+    Image.fromarray(pixels).save(path)
+    return path
+
+
+def _bench_detection(service, directory, batch_sizes, repeat):
+    image = _write_test_image(directory) or os.path.join(directory, 'missing.jpg')
+    results = {}
+    for kind in ('disease', 'pest'):
+        model = getattr(service, f'{kind}_model')
+        started = time.perf_counter()
+        service.detect_pest_disease(image, kind)
+        cold = time.perf_counter() - started
+        warm = _time_calls(lambda: service.detect_pest_disease(image, kind), repeat)
+        results[kind] = {
+            'path': 'cnn' if model is not None and os.path.exists(image) else 'heuristic',
+            'cold_ms': round(cold * 1000, 3),
+            'warm': _summary(warm),
+        }
+        if model is not None:
+            # What batching the CNN would buy; the API classifies one image per request
+            results[kind]['batches'] = {}
+            for size in batch_sizes:
+                arr = np.random.default_rng(size).random((size, 224, 224, 3)).astype('float32')
+                samples = _time_calls(lambda: model.predict(arr, verbose=0), max(3, repeat // 5))
+                results[kind]['batches'][str(size)] = dict(
+                    _summary(samples), images_per_second=round(size / statistics.median(samples), 1)
+                )
+    return results
+
+
+def _environment(estimator):
+    import sklearn
+
+    environment = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'estimator': estimator,
+        'tensorflow': tf.__version__ if tf is not None else None,
+    }
+    try:
+        import xgboost
+
+        environment['xgboost'] = xgboost.__version__
+    except ImportError:
+        pass
+    return environment
+
+
+def _warm_latencies(results, prefix=''):
+    """Flatten every p50 latency into {"path.to.measurement": ms}"""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_warm_latencies(value, f'{prefix}{key}.'))
+        elif key in ('p50_ms', 'cold_ms', 'load_ms'):
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+
+def _compare(results, baseline_path, tolerance, min_ms):
+    with open(baseline_path) as f:
+        baseline = _warm_latencies(json.load(f))
+    current = _warm_latencies(results)
+    regressions = 0
+    print(f"\ncompared with {baseline_path}:")
+    for key in sorted(set(baseline) & set(current)):
+        # Sub-millisecond timings are mostly noise
+        if max(baseline[key], current[key]) < min_ms:
+            continue
+        ratio = current[key] / baseline[key]
+        flag = 'REGRESSION' if ratio > tolerance else ''
+        regressions += bool(flag)
+        print(f"  {key:60} {baseline[key]:10.3f} -> {current[key]:10.3f} ms  x{ratio:5.2f} {flag}")
+    return regressions
+
+
+def main():
+    args = _parse_args()
+    with tempfile.TemporaryDirectory() as models_path:
+        estimator, training = _train_models(models_path, args.estimator, args.cnn_classes)
+        service, models, service_load_ms = _measure_loading(models_path)
+        results = {
+            'benchmark': 'ml_inference',
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'environment': _environment(estimator),
+            'training_seconds': training,
+            'loading': {'service_ms': service_load_ms, 'models': models},
+            'recommendations': _bench_recommendations(service, args.batch_sizes, args.repeat),
+            'detection': _bench_detection(service, models_path, args.batch_sizes, args.repeat),
+        }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline and _compare(results, args.baseline, args.tolerance, args.min_ms):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
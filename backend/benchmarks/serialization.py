@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Response serialization benchmark.
+
+Compares, per hot endpoint payload, the cost of FastAPI's response_model
+path (Pydantic validation from attributes, jsonable_encoder, stdlib
+json.dumps) with the direct path in responses.py (row dicts rendered by
+orjson, or the stdlib encoder when FAST_JSON=false). No database or HTTP
+is involved; payloads are built in memory. Run from the backend directory:
+    python -m benchmarks.serialization --rows 50 --repeat 200
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from responses import FAST_JSON, dumps, row_payload
+from schemas import (
+    CropRecommendationRecord, CropRecommendationResponse, MarketDataResponse,
+    MarketRecommendationResponse, NotificationResponse, SoilDataResponse,
+)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50, help='Rows per history page')
+    parser.add_argument('--repeat', type=int, default=200)
+    return parser.parse_args()
+
+
+def _payloads(rows: int):
+    now = datetime.now()
+    fertilizer = {'type': 'NPK 20-20-20', 'quantity_per_acre': '50-75 kg', 'application_method': 'Broadcast'}
+    recommendation = {
+        'crop_name': 'Rice', 'confidence_score': 0.82, 'expected_yield': 4012.5, 'expected_profit': 30093.75,
+        'sustainability_score': 0.71, 'fertilizer_recommendation': fertilizer,
+        'planting_date': now + timedelta(days=7), 'harvesting_date': now + timedelta(days=120),
+    }
+    points = [{
+        'crop_name': 'Rice', 'market_name': f'Market {i}', 'location': 'Guntur', 'price_per_kg': 24.5 + i,
+        'date': (now - timedelta(days=i)).isoformat(), 'quality_grade': 'A',
+    } for i in range(3)]
+    market = {'crop_name': 'Rice', 'best_markets': points, 'average_price': 25.5, 'price_trend': 'stable'}
+    # ORM rows stand in as attribute objects
+    notifications = [SimpleNamespace(
+        id=i, farmer_id=1, message=f'Weather Alert: Heavy rainfall expected in Guntur ({i})',
+        notification_type='weather', priority='high', is_sent=True, sent_at=now, suppressed_count=0,
+        created_at=now - timedelta(minutes=i),
+    ) for i in range(rows)]
+    soil = [SimpleNamespace(
+        id=i, farmer_id=1, location='Guntur', ph=6.8, nitrogen=45.2, phosphorus=28.5, potassium=38.7,
+        organic_matter=2.8, moisture=65.0, temperature=26.5, soil_type='Clay Loam', source='dataset',
+        created_at=now - timedelta(minutes=i),
+    ) for i in range(rows)]
+    history = [SimpleNamespace(id=i, farmer_id=1, created_at=now, **recommendation) for i in range(rows)]
+    # (endpoint, response_model, content, direct payload builder)
+    return [
+        ('POST /api/recommendations/crops', List[CropRecommendationResponse], [recommendation],
+         lambda rows: row_payload(rows, CropRecommendationResponse)),
+        ('GET /api/market/prices/{crop}', MarketRecommendationResponse, market,
+         lambda body: {**body, 'best_markets': row_payload(body['best_markets'], MarketDataResponse)}),
+        ('GET /api/notifications/history', List[NotificationResponse], notifications,
+         lambda rows: row_payload(rows, NotificationResponse)),
+        ('GET /api/soil/history', List[SoilDataResponse], soil,
+         lambda rows: row_payload(rows, SoilDataResponse)),
+        ('GET /api/recommendations/history', List[CropRecommendationRecord], history,
+         lambda rows: row_payload(rows, CropRecommendationRecord)),
+    ]
+
+
+def _response_model_path(adapter: TypeAdapter, content) -> bytes:
+    validated = adapter.validate_python(content, from_attributes=True)
+    encoded = jsonable_encoder(adapter.dump_python(validated, mode='json'))
+    return json.dumps(encoded, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+
+def _direct_path(content, build) -> bytes:
+    return dumps(build(content))
+
+
+def _time(fn, repeat: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    args = _parse_args()
+    print(f"encoder: {'orjson' if FAST_JSON else 'stdlib json'}, history rows: {args.rows}, repeat: {args.repeat}")
+    print(f"{'endpoint':36} {'response_model us':>18} {'direct us':>10} {'speedup':>8}")
+    for name, annotation, content, build in _payloads(args.rows):
+        adapter = TypeAdapter(annotation)
+        slow = _time(lambda: _response_model_path(adapter, content), args.repeat)
+        fast = _time(lambda: _direct_path(content, build), args.repeat)
+        print(f"{name:36} {slow:18.1f} {fast:10.1f} {slow / fast:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Response compression middleware.
+
+Bodies of at least COMPRESSION_MIN_SIZE bytes are compressed with brotli
+when the ``brotli`` package is installed and the client accepts ``br``,
+otherwise with gzip. Streamed responses (paginated history) are held back
+until COMPRESSION_MIN_SIZE bytes have arrived or the stream ends, so small
+pages go out uncompressed; larger ones are compressed chunk by chunk,
+flushing after each so it reaches the client as soon as it is produced.
+Responses that already carry a Content-Encoding, and image/audio/video
+bodies, pass through untouched.
+"""
+
+import os
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli  # type: ignore
+except Exception:
+    brotli = None  # type: ignore
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1000"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# Quality 4-5 is the usual trade-off for dynamic responses
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+_INCOMPRESSIBLE_TYPES = ("image/", "audio/", "video/")
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    encodings = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        encodings.add(name.strip())
+    return encodings
+
+
+class _GzipCompressor:
+    encoding = "gzip"
+
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        # Byte-aligned sync point: everything so far can be decoded
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    encoding = "br"
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        gzip_level: int = GZIP_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compressor(self, scope: Scope):
+        encodings = _accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and "br" in encodings:
+            return _BrotliCompressor(self.brotli_quality)
+        if "gzip" in encodings:
+            return _GzipCompressor(self.gzip_level)
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        compressor = self._compressor(scope) if scope["type"] == "http" else None
+        if compressor is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressionResponder(self.app, self.minimum_size, compressor)(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, minimum_size: int, compressor) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compressor = compressor
+        self.send: Optional[Send] = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+        self.buffer = bytearray()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Held back until the body size shows whether to compress
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers
+                or headers.get("content-type", "").startswith(_INCOMPRESSIBLE_TYPES)
+            )
+            return
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.passthrough:
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        if not self.started:
+            # Hold back leading chunks until they reach the threshold or the stream ends
+            self.buffer += body
+            if more_body and len(self.buffer) < self.minimum_size:
+                return
+            self.started = True
+            body, self.buffer = bytes(self.buffer), bytearray()
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            if len(body) < self.minimum_size:
+                await self.send(self.initial_message)
+                await self.send({"type": "http.response.body", "body": body})
+                self.passthrough = True
+                return
+            headers["Content-Encoding"] = self.compressor.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers and not headers["etag"].startswith("W/"):
+                # The compressed body is a different representation
+                headers["ETag"] = "W/" + headers["etag"]
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(body))
+                await self.send(self.initial_message)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            await self.send(self.initial_message)
+
+        # Without a flush, zlib and brotli would hold small chunks until finish()
+        chunk = self.compressor.compress(body)
+        chunk += self.compressor.flush() if more_body else self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -1,6 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Callable, Dict
 import os
 from dotenv import load_dotenv
 
@@ -9,14 +12,80 @@ load_dotenv()
 # Database URL - using SQLite for development, PostgreSQL for production
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./farmers.db")
 
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL)
+# Connection pool tuning (ignored for in-memory SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Async engine (asyncpg for PostgreSQL, aiosqlite for SQLite)
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+
+def _async_url(url: str) -> str:
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _async_url(DATABASE_URL))
+
+# SQLite production mode for small district deployments: WAL, tuned pragmas
+# and a single writer thread (see services/db_writer.py)
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+SQLITE_PRODUCTION = IS_SQLITE and os.getenv("SQLITE_PRODUCTION", "false").lower() == "true"
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    options: Dict[str, Any] = {}
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+        if ":memory:" in url or url.rstrip("/").endswith("sqlite:"):
+            return options
+        if url.startswith("sqlite+aiosqlite"):
+            # aiosqlite defaults to NullPool; pool file connections like the sync engine
+            options["poolclass"] = AsyncAdaptedQueuePool
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    return options
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+if SQLITE_PRODUCTION:
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    if SQLITE_PRODUCTION:
+        event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+else:
+    async_engine = None
+    AsyncSessionLocal = None
+
 def get_db():
     db = SessionLocal()
     try:
@@ -24,3 +93,75 @@ def get_db():
     finally:
         db.close()
 
+class AsyncDB:
+    """Runs sync ORM callables ``fn(session, *args)`` without blocking the event loop.
+
+    With DB_ASYNC=true the callable runs on an AsyncSession via ``run_sync``,
+    so its I/O goes through the async driver; otherwise it runs on a regular
+    Session in the threadpool.
+    """
+
+    def __init__(self):
+        # Created on first use, so requests served from caches never open one
+        self._session = None
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        if AsyncSessionLocal is not None:
+            if self._session is None:
+                self._session = AsyncSessionLocal()
+            return await self._session.run_sync(fn, *args, **kwargs)
+        if self._session is None:
+            self._session = SessionLocal()
+        return await run_in_threadpool(fn, self._session, *args, **kwargs)
+
+    async def close(self):
+        if self._session is None:
+            return
+        if AsyncSessionLocal is not None:
+            await self._session.close()
+        else:
+            await run_in_threadpool(self._session.close)
+
+def _run_with_session(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    db = SessionLocal()
+    try:
+        return fn(db, *args, **kwargs)
+    finally:
+        db.close()
+
+async def run_in_session(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run ``fn(session, *args)`` in a short-lived session of its own.
+
+    For reads outside a request; the connection is returned to the pool
+    before this returns, so many concurrent callers cannot pin the pool.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            return await session.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(_run_with_session, fn, *args, **kwargs)
+
+async def get_async_db():
+    db = AsyncDB()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+def _pool_stats(pool) -> Dict[str, Any]:
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "max_overflow": DB_MAX_OVERFLOW,
+    }
+
+def pool_status() -> Dict[str, Any]:
+    """Connection pool utilization for the sync and (if enabled) async engines"""
+    status = {"sync": _pool_stats(engine.pool)}
+    if async_engine is not None:
+        status["async"] = _pool_stats(async_engine.sync_engine.pool)
+    return status
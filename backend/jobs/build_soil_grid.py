@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Build the memory-mapped soil grid used by services/soil_provider.py.
+
+Input is a CSV of soil samples or district averages (e.g. a Soil Health
+Card export or a SoilGrids extract) with a state and district column,
+optional latitude/longitude, and any of the soil property columns.
+Samples are averaged per grid cell (or per district when there are no
+coordinates) and written as an .npy array with a .json sidecar.
+
+Run from the backend directory:
+    python -m jobs.build_soil_grid soil_samples.csv [--resolution 0.05] [--output data/soil_grid.npy]
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from services.soil_provider import GRID_COLUMNS, SOIL_FIELDS, SOIL_GRID_PATH, metadata_path, region_key
+
+# Common spellings in soil datasets -> grid column
+COLUMN_ALIASES = {
+    'lat': 'latitude', 'lon': 'longitude', 'lng': 'longitude', 'long': 'longitude',
+    'n': 'nitrogen', 'p': 'phosphorus', 'k': 'potassium',
+    'oc': 'organic_matter', 'organic_carbon': 'organic_matter', 'om': 'organic_matter',
+    'soil_moisture': 'moisture', 'soil_temperature': 'temperature', 'state_name': 'state',
+    'district_name': 'district', 'soiltype': 'soil_type',
+}
+
+
+def load_samples(path: str) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
+    df = df.rename(columns={c: COLUMN_ALIASES.get(c, c) for c in df.columns})
+    if 'state' not in df.columns or 'district' not in df.columns:
+        raise SystemExit("Soil CSV needs state and district columns")
+    for column in ('latitude', 'longitude') + SOIL_FIELDS:
+        if column not in df.columns:
+            df[column] = np.nan
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    if 'soil_type' not in df.columns:
+        df['soil_type'] = None
+    df['region'] = [region_key(str(s), str(d)) for s, d in zip(df['state'], df['district'])]
+    return df
+
+
+def build_grid(df: pd.DataFrame, resolution: float):
+    located = df['latitude'].notna() & df['longitude'].notna()
+    # Snap samples to grid cells; unlocated samples form one cell per district
+    df['cell'] = np.where(
+        located,
+        (df['latitude'] / resolution).round().astype('Int64').astype(str) + ':'
+        + (df['longitude'] / resolution).round().astype('Int64').astype(str),
+        'region:' + df['region'],
+    )
+    numeric = df.groupby('cell', sort=False)[['latitude', 'longitude'] + list(SOIL_FIELDS)].mean()
+    soil_types = df.dropna(subset=['soil_type']).groupby('cell', sort=False)['soil_type'].agg(
+        lambda values: values.mode().iloc[0]
+    )
+    type_names = sorted(soil_types.unique().tolist())
+    type_codes = soil_types.map({name: code for code, name in enumerate(type_names)})
+
+    cells = np.full((len(numeric), len(GRID_COLUMNS)), np.nan)
+    for column in ('latitude', 'longitude') + SOIL_FIELDS:
+        cells[:, GRID_COLUMNS.index(column)] = numeric[column].to_numpy()
+    cells[:, GRID_COLUMNS.index('soil_type')] = type_codes.reindex(numeric.index).to_numpy(dtype=float)
+
+    # Each district points at the cell nearest its mean sample position
+    positions = {cell: i for i, cell in enumerate(numeric.index)}
+    regions = {}
+    for region, samples in df.groupby('region', sort=False):
+        region_cells = samples['cell'].unique()
+        if len(region_cells) == 1:
+            regions[region] = positions[region_cells[0]]
+            continue
+        centre = samples[['latitude', 'longitude']].mean().to_numpy()
+        candidates = [positions[c] for c in region_cells]
+        offsets = cells[candidates, :2] - centre
+        regions[region] = candidates[int(np.nanargmin((offsets ** 2).sum(axis=1)))]
+    return cells, {'soil_types': type_names, 'regions': regions, 'resolution': resolution}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the soil grid from a soil samples CSV")
+    parser.add_argument('csv', help='Soil samples or district averages')
+    parser.add_argument('--resolution', type=float, default=0.05, help='Grid cell size in degrees')
+    parser.add_argument('--output', default=SOIL_GRID_PATH)
+    args = parser.parse_args(argv)
+
+    cells, metadata = build_grid(load_samples(args.csv), args.resolution)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    np.save(args.output, cells)
+    with open(metadata_path(args.output), 'w') as f:
+        json.dump(metadata, f)
+    print(f"Wrote {len(cells)} soil cells for {len(metadata['regions'])} districts to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
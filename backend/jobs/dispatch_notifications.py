@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Standalone notification outbox dispatcher.
+
+The dispatcher must run in exactly one process: each instance has its own
+SMS rate limiter, so N copies would send at N times SMS_RATE_PER_SECOND.
+A single-process server runs it in-app; with several workers serve.py
+turns it off in the workers (DISPATCHER_ENABLED=false) and starts this
+job next to them. Run it yourself when the app is started some other way.
+
+Run from the backend directory:
+    python -m jobs.dispatch_notifications
+"""
+
+import asyncio
+import logging
+import signal
+
+from sqlalchemy import inspect
+
+from database import engine
+from services.db_writer import db_writer
+from services.notification_dispatcher import notification_dispatcher
+
+logger = logging.getLogger("jobs.dispatch_notifications")
+
+# How often delivery counters are logged
+STATS_INTERVAL_SECONDS = 60
+
+
+async def _wait_for_schema(stop: asyncio.Event):
+    """The app creates the tables; when started beside it, wait for them"""
+    # A fresh inspector each time; inspectors cache what they have seen
+    while not await asyncio.to_thread(lambda: inspect(engine).has_table("notifications")):
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=1.0)
+            return
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _run():
+    if not notification_dispatcher.enabled:
+        logger.warning("No SMS provider configured; nothing to dispatch")
+        return
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await _wait_for_schema(stop)
+    notification_dispatcher.start()
+    try:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=STATS_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                logger.info("Dispatcher stats: %s", notification_dispatcher.stats())
+    finally:
+        await notification_dispatcher.stop()
+        db_writer.stop()
+        engine.dispose()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    asyncio.run(_run())
+
+
+if __name__ == '__main__':
+    main()
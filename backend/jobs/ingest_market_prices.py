@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Bulk ingestion of mandi price CSVs into market_data.
+
+Loads the same Kaggle price datasets used by ml/train_price_model.py (or
+explicit CSV paths), maps their columns onto MarketData and upserts them in
+batches keyed on (crop_key, market_name, date), so re-runs are idempotent.
+PostgreSQL loads go through COPY into a staging table; other databases use
+batched executemany upserts. Touched crop summaries are refreshed at the end.
+
+Databases loaded before the upsert index existed may hold duplicate
+(crop_key, market_name, date) rows, and the app refuses to start until
+they are gone. --dedupe deletes them (keeping the oldest of each) first.
+
+Run from the backend directory:
+    python -m jobs.ingest_market_prices [--download] [--datasets-dir ../datasets]
+    python -m jobs.ingest_market_prices path/to/prices.csv ...
+    python -m jobs.ingest_market_prices --dedupe
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+import pandas as pd
+
+from database import SessionLocal, engine
+from migrations import dedupe_market_data, run_migrations
+from models import Base, MarketData
+from services.market_summary import refresh_price_summaries
+from ml.price_datasets import DATASET_SLUGS, iter_csv_paths
+
+CHUNK_ROWS = 100000
+BATCH_SIZE = 5000
+
+# Candidate source columns per MarketData field, after _normalize_columns
+COLUMN_CANDIDATES = {
+    'crop_name': ['commodity', 'crop', 'crop_name', 'commodity_name', 'item'],
+    'market_name': ['market', 'market_name', 'mandi', 'mandi_name', 'apmc'],
+    'district': ['district', 'district_name'],
+    'state': ['state', 'state_name'],
+    'location': ['location', 'city'],
+    'price': ['modal_price', 'modal_price_rs_quintal', 'price', 'price_per_kg', 'avg_price', 'average_price'],
+    'date': ['arrival_date', 'date', 'price_date', 'reported_date'],
+    'quality_grade': ['grade', 'quality', 'quality_grade'],
+}
+
+UPSERT_COLUMNS = ['crop_name', 'crop_key', 'market_name', 'location', 'price_per_kg', 'date', 'quality_grade']
+CONFLICT_COLUMNS = ['crop_key', 'market_name', 'date']
+
+
+def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [
+        c.strip().lower().replace('_x0020_', '_').replace(' ', '_').replace('.', '').replace('/', '_')
+        .replace('(', '').replace(')', '')
+        for c in df.columns
+    ]
+    return df
+
+
+def _pick(columns: Iterable[str], field: str) -> Optional[str]:
+    columns = list(columns)
+    for candidate in COLUMN_CANDIDATES[field]:
+        if candidate in columns:
+            return candidate
+    return None
+
+
+def _price_divisor(price_col: str, price_unit: str) -> float:
+    if price_unit == 'kg':
+        return 1.0
+    if price_unit == 'quintal':
+        return 100.0
+    # Agmarknet modal/min/max prices are reported in Rs per quintal
+    return 100.0 if ('modal' in price_col or 'quintal' in price_col) else 1.0
+
+
+def _text(values: pd.Series) -> pd.Series:
+    """Stripped strings; missing and blank cells stay missing instead of becoming 'nan'"""
+    text = values.where(values.notna()).astype(str).str.strip()
+    return text.where(values.notna() & (text != ''))
+
+
+def map_chunk(df: pd.DataFrame, price_unit: str = 'auto') -> Optional[pd.DataFrame]:
+    """Map a raw price CSV chunk onto MarketData columns, or None if unusable"""
+    df = _normalize_columns(df)
+    crop_col = _pick(df.columns, 'crop_name')
+    price_col = _pick(df.columns, 'price')
+    date_col = _pick(df.columns, 'date')
+    if not (crop_col and price_col and date_col):
+        return None
+
+    out = pd.DataFrame()
+    out['crop_name'] = _text(df[crop_col]).str.slice(0, 100)
+    out['crop_key'] = out['crop_name'].str.lower().str.replace(r'[\s_\-]+', ' ', regex=True)
+
+    market_col = _pick(df.columns, 'market_name')
+    out['market_name'] = _text(df[market_col]).fillna('Unknown').str.slice(0, 100) if market_col else 'Unknown'
+
+    location_col = _pick(df.columns, 'location')
+    district_col = _pick(df.columns, 'district')
+    state_col = _pick(df.columns, 'state')
+    if location_col:
+        location = _text(df[location_col])
+    elif district_col and state_col:
+        district, state = _text(df[district_col]), _text(df[state_col])
+        # Either part alone when the other is missing
+        location = (district + ', ' + state).fillna(district).fillna(state)
+    elif district_col or state_col:
+        location = _text(df[district_col or state_col])
+    else:
+        location = pd.Series(None, index=df.index, dtype=object)
+    out['location'] = location.fillna('Unknown').str.slice(0, 100)
+
+    prices = pd.to_numeric(df[price_col], errors='coerce')
+    out['price_per_kg'] = (prices / _price_divisor(price_col, price_unit)).round(2)
+    out['date'] = pd.to_datetime(df[date_col], errors='coerce', dayfirst=True).dt.normalize()
+
+    grade_col = _pick(df.columns, 'quality_grade')
+    out['quality_grade'] = _text(df[grade_col]).str.slice(0, 20) if grade_col else None
+
+    out = out.dropna(subset=['crop_name', 'price_per_kg', 'date'])
+    out = out[out['price_per_kg'] > 0]
+    # ON CONFLICT cannot touch the same row twice in one statement
+    return out.drop_duplicates(subset=CONFLICT_COLUMNS, keep='last')
+
+
+def _iter_records(df: pd.DataFrame, batch_size: int) -> Iterator[List[Dict]]:
+    df = df.astype(object).where(pd.notnull(df), None)
+    df['date'] = [d.to_pydatetime() for d in df['date']]
+    records = df.to_dict('records')
+    for start in range(0, len(records), batch_size):
+        yield records[start:start + batch_size]
+
+
+def _upsert_executemany(df: pd.DataFrame, batch_size: int):
+    if engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(MarketData.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=CONFLICT_COLUMNS,
+        set_={c: stmt.excluded[c] for c in ('crop_name', 'location', 'price_per_kg', 'quality_grade')},
+    )
+    for batch in _iter_records(df, batch_size):
+        with engine.begin() as conn:
+            conn.execute(stmt, batch)
+
+
+def _upsert_copy(df: pd.DataFrame):
+    """PostgreSQL fast path: COPY into a temp staging table, then one upsert"""
+    buf = io.StringIO()
+    df[UPSERT_COLUMNS].to_csv(buf, index=False, header=False, date_format='%Y-%m-%d %H:%M:%S')
+    buf.seek(0)
+    cols = ', '.join(UPSERT_COLUMNS)
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute(
+            "CREATE TEMP TABLE market_data_staging "
+            "(LIKE market_data INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+        cur.copy_expert(f"COPY market_data_staging ({cols}) FROM STDIN WITH (FORMAT csv)", buf)
+        cur.execute(
+            f"INSERT INTO market_data ({cols}) "
+            f"SELECT {cols} FROM market_data_staging "
+            f"ON CONFLICT (crop_key, market_name, date) DO UPDATE SET "
+            f"crop_name = EXCLUDED.crop_name, location = EXCLUDED.location, "
+            f"price_per_kg = EXCLUDED.price_per_kg, quality_grade = EXCLUDED.quality_grade"
+        )
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def ingest_csv(path: str, price_unit: str = 'auto', batch_size: int = BATCH_SIZE,
+               touched: Optional[Set[str]] = None) -> int:
+    """Stream one CSV into market_data; returns the number of rows upserted"""
+    use_copy = engine.dialect.name == 'postgresql'
+    loaded = 0
+    for chunk in pd.read_csv(path, chunksize=CHUNK_ROWS, low_memory=False):
+        mapped = map_chunk(chunk, price_unit)
+        if mapped is None:
+            print(f"  skipping {path}: no crop/price/date columns")
+            return loaded
+        if mapped.empty:
+            continue
+        if use_copy:
+            _upsert_copy(mapped)
+        else:
+            _upsert_executemany(mapped, batch_size)
+        loaded += len(mapped)
+        if touched is not None:
+            touched.update(mapped['crop_key'].unique())
+    return loaded
+
+
+def _dataset_paths(datasets_dir: str, download: bool) -> List[str]:
+    paths = []
+    for slug in DATASET_SLUGS:
+        sub = slug.split('/')[-1]
+        if download:
+            from ml.kaggle_manager import KaggleDatasetManager
+            KaggleDatasetManager(datasets_dir).download_if_missing(slug, sub)
+        paths.extend(iter_csv_paths(datasets_dir, sub))
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk load mandi price CSVs into market_data")
+    parser.add_argument('paths', nargs='*', help='CSV files to load (default: the price model datasets)')
+    parser.add_argument('--datasets-dir', default=os.getenv('DATASETS_DIR', 'datasets'))
+    parser.add_argument('--download', action='store_true', help='Download missing Kaggle datasets first')
+    parser.add_argument('--price-unit', choices=['auto', 'kg', 'quintal'], default='auto')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--dedupe', action='store_true',
+                        help='Delete duplicate market_data rows (keeps the oldest); alone, loads nothing')
+    args = parser.parse_args(argv)
+
+    Base.metadata.create_all(bind=engine)
+    if args.dedupe:
+        removed = dedupe_market_data(engine)
+        print(f"Removed {removed} duplicate market_data rows")
+    run_migrations(engine)
+    if args.dedupe and not (args.paths or args.download):
+        return
+
+    paths = args.paths or _dataset_paths(args.datasets_dir, args.download)
+    if not paths:
+        print("No price CSVs found; pass paths or use --download")
+        sys.exit(1)
+
+    touched: Set[str] = set()
+    total = 0
+    started = time.perf_counter()
+    for path in paths:
+        t0 = time.perf_counter()
+        loaded = ingest_csv(path, args.price_unit, args.batch_size, touched)
+        total += loaded
+        print(f"  {path}: {loaded} rows in {time.perf_counter() - t0:.1f}s")
+
+    db = SessionLocal()
+    try:
+        refreshed = refresh_price_summaries(db, touched)
+        db.commit()
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Upserted {total} rows from {len(paths)} files in {elapsed:.1f}s "
+          f"({total / max(elapsed, 1e-9):.0f} rows/s); refreshed {refreshed} crop summaries")
+
+
+if __name__ == '__main__':
+    main()
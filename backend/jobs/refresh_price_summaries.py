@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Batch refresh of the per-crop market price summaries.
+
+Run from the backend directory:
+    python -m jobs.refresh_price_summaries [crop ...]
+"""
+
+import sys
+
+from database import SessionLocal, engine
+from models import Base, normalize_crop_key
+from migrations import run_migrations
+from services.market_summary import refresh_price_summaries
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    crop_keys = [normalize_crop_key(c) for c in argv] or None
+    db = SessionLocal()
+    try:
+        count = refresh_price_summaries(db, crop_keys)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Refreshed {count} market price summaries")
+
+
+if __name__ == '__main__':
+    main()
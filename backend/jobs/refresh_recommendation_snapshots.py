@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Precompute crop recommendations for every farmer district and season.
+
+Soil and weather inputs are location-level, so every farmer in a district
+gets the same model output for a season. This job runs the models once,
+vectorized over all state/district/season combinations, and stores the
+results for /api/recommendations/crops to look up.
+
+Run from the backend directory (e.g. nightly from cron):
+    python -m jobs.refresh_recommendation_snapshots [--batch-size N] [state ...]
+"""
+
+import argparse
+import asyncio
+from typing import Any, Dict, List, Tuple
+
+from database import SessionLocal, async_engine, engine
+from models import Base, normalize_region_key
+from migrations import run_migrations
+from routers.recommendations import get_weather_data, ml_service
+from routers.soil import get_soil_data
+from services.recommendation_snapshots import SEASONS, farmer_regions, store_snapshots
+
+
+async def _load_inputs(regions: List[Tuple[str, str]]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    # The district stands in for the farmer's location
+    soil = await asyncio.gather(*(get_soil_data(district, state, district) for state, district in regions))
+    weather = await asyncio.gather(*(get_weather_data(district, state, district) for state, district in regions))
+    if async_engine is not None:
+        # Its connections belong to this event loop
+        await async_engine.dispose()
+    return list(zip(soil, weather))
+
+
+def build_snapshots(regions: List[Tuple[str, str]], batch_size: int) -> List[Dict[str, Any]]:
+    inputs = asyncio.run(_load_inputs(regions))
+    rows = [
+        (state, district, season, soil_data, weather_data)
+        for (state, district), (soil_data, weather_data) in zip(regions, inputs)
+        for season in SEASONS
+    ]
+    snapshots = []
+    for start in range(0, len(rows), batch_size):
+        chunk = rows[start:start + batch_size]
+        results = ml_service.get_crop_recommendations_batch(
+            [(soil_data, weather_data, season, state) for state, _, season, soil_data, weather_data in chunk]
+        )
+        for (state, district, season, soil_data, weather_data), recommendations in zip(chunk, results):
+            snapshots.append({
+                'state': state,
+                'district': district,
+                'season': season,
+                'recommendations': recommendations,
+                'inputs': {'soil': soil_data, 'weather': weather_data},
+            })
+    return snapshots
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute district-level crop recommendations")
+    parser.add_argument('states', nargs='*', help='Only refresh these states')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Inputs per model call')
+    args = parser.parse_args(argv)
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        regions = farmer_regions(db)
+        if args.states:
+            wanted = {normalize_region_key(s) for s in args.states}
+            regions = [r for r in regions if normalize_region_key(r[0]) in wanted]
+        snapshots = build_snapshots(regions, args.batch_size)
+        count = store_snapshots(db, snapshots)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Stored {count} recommendation snapshots for {len(regions)} districts")
+
+
+if __name__ == '__main__':
+    main()
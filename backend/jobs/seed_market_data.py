@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Seed sample market data for demos and development.
+
+Replaces the old on-demand generation inside GET /api/market/prices, so the
+serving path stays read-only. Crops that already have prices are skipped
+unless --force is given.
+
+Run from the backend directory:
+    python -m jobs.seed_market_data [crop ...] [--days 5] [--force]
+"""
+
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from database import SessionLocal, engine
+from migrations import run_migrations
+from models import Base, MarketData, MarketPriceSummary, normalize_crop_key
+from services.market_summary import record_market_prices
+
+MARKETS = [
+    {"name": "Amaravathi Market", "location": "Amaravathi, AP"},
+    {"name": "Guntur Market", "location": "Guntur, AP"},
+    {"name": "Vijayawada Market", "location": "Vijayawada, AP"},
+    {"name": "Hyderabad Market", "location": "Hyderabad, TS"},
+    {"name": "Bangalore Market", "location": "Bangalore, KA"}
+]
+
+# Base prices for different crops
+BASE_PRICES = {
+    'rice': 25, 'wheat': 20, 'maize': 18, 'sugarcane': 3,
+    'cotton': 60, 'millets': 15, 'tomato': 30, 'onion': 25
+}
+
+
+def build_sample_rows(crop_name: str, days: int):
+    """Sample price rows for one crop: one random market per day"""
+    base_price = BASE_PRICES.get(crop_name.lower(), 20)
+    now = datetime.now()
+    rows = []
+    for i in range(days):
+        market = random.choice(MARKETS)
+        rows.append(MarketData(
+            crop_name=crop_name,
+            market_name=market['name'],
+            location=market['location'],
+            price_per_kg=round(base_price + random.uniform(-5, 10), 2),
+            date=now - timedelta(days=i),
+            quality_grade=random.choice(['A', 'B', 'C'])
+        ))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed sample market data")
+    parser.add_argument('crops', nargs='*', help='Crops to seed (default: all sample crops)')
+    parser.add_argument('--days', type=int, default=5)
+    parser.add_argument('--force', action='store_true', help='Seed crops that already have prices')
+    args = parser.parse_args(argv)
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    crops = args.crops or [c.title() for c in BASE_PRICES]
+    db = SessionLocal()
+    try:
+        existing = {key for (key,) in db.query(MarketPriceSummary.crop_key).all()}
+        seeded = []
+        for crop in crops:
+            if normalize_crop_key(crop) in existing and not args.force:
+                continue
+            rows = build_sample_rows(crop, args.days)
+            db.add_all(rows)
+            record_market_prices(db, rows)
+            db.commit()
+            seeded.append(crop)
+    finally:
+        db.close()
+    print(f"Seeded {len(seeded)} crops: {', '.join(seeded) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
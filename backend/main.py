@@ -1,29 +1,43 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 import uvicorn
+import asyncio
 import os
 from dotenv import load_dotenv
 
-from database import get_db, engine
-from models import Base
+from database import get_db, engine, async_engine, SessionLocal, pool_status
+from models import Base, MarketData, MarketPriceSummary
+from migrations import run_migrations
+from compression import CompressionMiddleware
+from responses import FastJSONResponse
 from routers import auth, recommendations, soil, market, notifications
 # Updated endpoints will be exposed via new unified router `api_v2`
 from routers import api_v2
-from services.ml_service import MLService
+from services.ml_service import get_ml_service
+from services.market_summary import refresh_price_summaries
+from services.soil_provider import get_soil_grid
+from services.db_writer import db_writer
+from services.notification_dispatcher import DISPATCHER_ENABLED, notification_dispatcher
+from services.batch_writer import stop_batch_writers
+from services.profiler import ProfilingMiddleware, sampler
+from services.metrics import CONTENT_TYPE, METRICS_ENABLED, MetricsMiddleware, instrument_engine, monitor_event_loop, render_metrics
 
 # Load environment variables
 load_dotenv()
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="AI Crop Recommendation and Farmer Advisory System",
     description="An AI-powered system for crop recommendations, pest/disease detection, and farmer advisory",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson-rendered JSON for routes without a response_model
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware
@@ -33,8 +47,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# gzip/brotli for responses above COMPRESSION_MIN_SIZE
+app.add_middleware(CompressionMiddleware)
+
+# Stack profiles of slow (or admin-requested) requests, see services/profiler.py
+app.add_middleware(ProfilingMiddleware)
+
+# Per-route latency histograms for /metrics (outermost, so it sees the full request)
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine, "sync")
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine, "async")
+
 # Security
 security = HTTPBearer()
 
@@ -47,7 +74,53 @@ app.include_router(notifications.router, prefix="/api/notifications", tags=["Not
 app.include_router(api_v2.router, prefix="/api", tags=["v2"])
 
 # Initialize ML service
-ml_service = MLService()
+ml_service = get_ml_service()
+
+def _bootstrap_price_summaries():
+    db = SessionLocal()
+    try:
+        if db.query(MarketPriceSummary.id).first() is None and db.query(MarketData.id).first() is not None:
+            refresh_price_summaries(db)
+            db.commit()
+    finally:
+        db.close()
+
+@app.on_event("startup")
+async def bootstrap_price_summaries():
+    """Build market price summaries once for databases that predate them"""
+    # Synchronous queries, so off the event loop
+    await asyncio.to_thread(_bootstrap_price_summaries)
+
+@app.on_event("startup")
+async def load_soil_grid():
+    # Off the event loop: indexing a large grid takes a while
+    await asyncio.to_thread(get_soil_grid)
+
+@app.on_event("startup")
+async def start_notification_dispatcher():
+    # Off in multi-worker servers, where jobs/dispatch_notifications.py runs it once
+    if DISPATCHER_ENABLED:
+        notification_dispatcher.start()
+
+_event_loop_monitor = None
+
+@app.on_event("startup")
+async def start_event_loop_monitor():
+    global _event_loop_monitor
+    if METRICS_ENABLED:
+        _event_loop_monitor = asyncio.create_task(monitor_event_loop())
+
+@app.on_event("shutdown")
+async def close_database_pools():
+    if _event_loop_monitor is not None:
+        _event_loop_monitor.cancel()
+    sampler.stop()
+    await notification_dispatcher.stop()
+    await stop_batch_writers()
+    db_writer.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
 
 @app.get("/")
 async def root():
@@ -57,6 +130,18 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/db")
+async def database_health():
+    """Connection pool utilization"""
+    return pool_status()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics (needs prometheus_client)"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled or prometheus_client is not installed")
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
 
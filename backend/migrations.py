@@ -0,0 +1,128 @@
+"""
+Idempotent schema migrations for databases created before a model change.
+
+``Base.metadata.create_all`` only creates missing tables, so columns and
+indexes added to existing tables are applied here. Every step checks the
+live schema first and is safe to run on each startup.
+"""
+
+import os
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from models import Base, normalize_crop_key
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Opt-in pg_trgm GIN indexes backing fuzzy ``LIKE '%crop%'`` searches
+ENABLE_TRGM_INDEXES = os.getenv("ENABLE_TRGM_INDEXES", "false").lower() == "true"
+
+
+def _add_column_if_missing(conn: Connection, table: str, column: str, ddl_type: str):
+    columns = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column not in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+
+def _create_missing_indexes(conn: Connection):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _convert_text_column_to_jsonb(conn: Connection, table: str, column: str):
+    # Earlier schemas stored JSON as serialized text; SQLite needs no change
+    if conn.dialect.name != "postgresql":
+        return
+    data_type = conn.execute(text(
+        "SELECT data_type FROM information_schema.columns WHERE table_name = :table AND column_name = :column"
+    ), {"table": table, "column": column}).scalar()
+    if data_type == "text":
+        conn.execute(text(
+            f"ALTER TABLE {table} ALTER COLUMN {column} TYPE JSONB "
+            f"USING NULLIF({column}, 'null')::jsonb"
+        ))
+
+
+def _backfill_market_crop_keys(conn: Connection):
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, crop_name FROM market_data WHERE crop_key IS NULL LIMIT :limit"
+        ), {"limit": BACKFILL_BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            text("UPDATE market_data SET crop_key = :crop_key WHERE id = :id"),
+            [{"id": row.id, "crop_key": normalize_crop_key(row.crop_name)} for row in rows],
+        )
+
+
+class DuplicateMarketDataError(RuntimeError):
+    """market_data has rows the unique upsert index would reject"""
+
+
+def _count_market_data_duplicates(conn: Connection) -> int:
+    return conn.execute(text(
+        "SELECT COALESCE(SUM(n - 1), 0) FROM ("
+        "SELECT COUNT(*) AS n FROM market_data GROUP BY crop_key, market_name, date HAVING COUNT(*) > 1) d"
+    )).scalar()
+
+
+def _check_market_data_duplicates(conn: Connection):
+    # The unique upsert index cannot be built while duplicates exist; removing
+    # them deletes data, so that is left to an explicit command
+    indexes = {i["name"] for i in inspect(conn).get_indexes("market_data")}
+    if "uq_market_data_crop_market_date" in indexes:
+        return
+    duplicates = _count_market_data_duplicates(conn)
+    if duplicates:
+        raise DuplicateMarketDataError(
+            f"market_data has {duplicates} duplicate (crop_key, market_name, date) rows; remove them with "
+            "`python -m jobs.ingest_market_prices --dedupe` before starting the app"
+        )
+
+
+def dedupe_market_data(engine: Engine) -> int:
+    """Delete duplicate market_data rows, keeping the oldest of each; returns the number removed"""
+    with engine.begin() as conn:
+        _add_column_if_missing(conn, "market_data", "crop_key", "VARCHAR(100)")
+        _backfill_market_crop_keys(conn)
+        result = conn.execute(text(
+            "DELETE FROM market_data WHERE id NOT IN ("
+            "SELECT MIN(id) FROM market_data GROUP BY crop_key, market_name, date)"
+        ))
+        return result.rowcount
+
+
+def _create_trgm_indexes(conn: Connection):
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_market_data_crop_name_trgm "
+        "ON market_data USING gin (crop_name gin_trgm_ops)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_market_price_summaries_crop_key_trgm "
+        "ON market_price_summaries USING gin (crop_key gin_trgm_ops)"
+    ))
+
+
+def run_migrations(engine: Engine):
+    """Bring an existing database up to the current models"""
+    with engine.begin() as conn:
+        _add_column_if_missing(conn, "market_data", "crop_key", "VARCHAR(100)")
+        _backfill_market_crop_keys(conn)
+        _check_market_data_duplicates(conn)
+        _add_column_if_missing(conn, "notifications", "attempts", "INTEGER NOT NULL DEFAULT 0")
+        _add_column_if_missing(conn, "notifications", "next_attempt_at", "TIMESTAMP")
+        _add_column_if_missing(conn, "notifications", "last_error", "TEXT")
+        _add_column_if_missing(conn, "notifications", "broadcast_id", "INTEGER REFERENCES notification_broadcasts(id)")
+        _add_column_if_missing(conn, "notifications", "dedupe_key", "VARCHAR(40)")
+        _add_column_if_missing(conn, "notifications", "coalesce_until", "TIMESTAMP")
+        _add_column_if_missing(conn, "notifications", "suppressed_count", "INTEGER NOT NULL DEFAULT 0")
+        _convert_text_column_to_jsonb(conn, "crop_recommendations", "fertilizer_recommendation")
+        _add_column_if_missing(conn, "weather_data", "location_key", "VARCHAR(120)")
+        _add_column_if_missing(conn, "weather_data", "bucket_start", "TIMESTAMP")
+        _create_missing_indexes(conn)
+        if ENABLE_TRGM_INDEXES and conn.dialect.name == "postgresql":
+            _create_trgm_indexes(conn)
@@ -0,0 +1,27 @@
+import os
+import pandas as pd
+
+# Kaggle mandi/commodity price datasets shared by price model training and
+# MarketData ingestion
+DATASET_SLUGS = [
+    "arjunyadav99/indian-agricultural-mandi-prices-20232025",
+    "zoya77/simulated-crop-price-with-economic-indicators-data",
+    "varshitanalluri/crop-price-prediction-dataset",
+    "anshtanwar/current-daily-price-of-various-commodities-india"
+]
+
+def iter_csv_paths(base_dir: str, subdir: str):
+    folder = os.path.join(base_dir, subdir)
+    for root, _, files in os.walk(folder):
+        for f in sorted(files):
+            if f.lower().endswith('.csv'):
+                yield os.path.join(root, f)
+
+def load_any_csvs(base_dir: str, subdir: str):
+    for path in iter_csv_paths(base_dir, subdir):
+        try:
+            df = pd.read_csv(path)
+            if len(df) > 10:
+                yield df
+        except Exception:
+            continue
@@ -6,26 +6,7 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error
 from xgboost import XGBRegressor
 from kaggle_manager import KaggleDatasetManager, ensure_dir
-
-DATASET_SLUGS = [
-    "arjunyadav99/indian-agricultural-mandi-prices-20232025",
-    "zoya77/simulated-crop-price-with-economic-indicators-data",
-    "varshitanalluri/crop-price-prediction-dataset",
-    "anshtanwar/current-daily-price-of-various-commodities-india"
-]
-
-def load_any_csvs(base_dir: str, subdir: str):
-    folder = os.path.join(base_dir, subdir)
-    for root, _, files in os.walk(folder):
-        for f in files:
-            if f.lower().endswith('.csv'):
-                path = os.path.join(root, f)
-                try:
-                    df = pd.read_csv(path)
-                    if len(df) > 10:
-                        yield df
-                except Exception:
-                    continue
+from price_datasets import DATASET_SLUGS, load_any_csvs
 
 def main():
     datasets_root = os.getenv('DATASETS_DIR', 'datasets')
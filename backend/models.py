@@ -1,7 +1,17 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 from database import Base
+import re
+
+def normalize_crop_key(crop_name: str) -> str:
+    """Normalize a crop name into a stable lookup key ("Paddy_Dhan " -> "paddy dhan")"""
+    return re.sub(r"[\s_\-]+", " ", crop_name.strip().lower())
+
+def normalize_region_key(name: str) -> str:
+    """Normalize a state, district or season name the same way ("Tamil_Nadu" -> "tamil nadu")"""
+    return normalize_crop_key(name)
 
 class Farmer(Base):
     __tablename__ = "farmers"
@@ -24,6 +34,9 @@ class Farmer(Base):
     soil_data = relationship("SoilData", back_populates="farmer")
     notifications = relationship("Notification", back_populates="farmer")
 
+# Broadcast targeting by region
+Index("ix_farmers_region", Farmer.state, Farmer.district, Farmer.village)
+
 class SoilData(Base):
     __tablename__ = "soil_data"
     
@@ -44,6 +57,8 @@ class SoilData(Base):
     # Relationships
     farmer = relationship("Farmer", back_populates="soil_data")
 
+Index("ix_soil_data_farmer_created", SoilData.farmer_id, SoilData.created_at.desc())
+
 class WeatherData(Base):
     __tablename__ = "weather_data"
     
@@ -56,8 +71,14 @@ class WeatherData(Base):
     pressure = Column(Float, nullable=True)
     weather_condition = Column(String(50), nullable=False)
     forecast_days = Column(Integer, default=7)
+    # Cache key for services/weather_provider.py: normalized state|district
+    # and the start of the time bucket the reading belongs to
+    location_key = Column(String(120), nullable=True)
+    bucket_start = Column(DateTime, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+Index("uq_weather_data_location_bucket", WeatherData.location_key, WeatherData.bucket_start, unique=True)
+
 class CropHistory(Base):
     __tablename__ = "crop_history"
     
@@ -85,11 +106,35 @@ class CropRecommendation(Base):
     expected_yield = Column(Float, nullable=False)
     expected_profit = Column(Float, nullable=False)
     sustainability_score = Column(Float, nullable=False)
-    fertilizer_recommendation = Column(Text, nullable=True)  # JSON string
+    fertilizer_recommendation = Column(
+        JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"), nullable=True
+    )
     planting_date = Column(DateTime, nullable=True)
     harvesting_date = Column(DateTime, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+Index("ix_crop_recommendations_farmer_created", CropRecommendation.farmer_id, CropRecommendation.created_at.desc())
+
+class RecommendationSnapshot(Base):
+    """Crop recommendations precomputed per state, district and season
+    by jobs/refresh_recommendation_snapshots.py"""
+    __tablename__ = "recommendation_snapshots"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    state_key = Column(String(50), nullable=False)
+    district_key = Column(String(50), nullable=False)
+    season = Column(String(20), nullable=False)
+    recommendations = Column(JSON, nullable=False)
+    # Soil and weather inputs the snapshot was computed from
+    inputs = Column(JSON, nullable=True)
+    computed_at = Column(DateTime, nullable=False)
+
+Index(
+    "uq_recommendation_snapshots_region_season",
+    RecommendationSnapshot.state_key, RecommendationSnapshot.district_key, RecommendationSnapshot.season,
+    unique=True
+)
+
 class PestDetection(Base):
     __tablename__ = "pest_detections"
     
@@ -119,12 +164,34 @@ class MarketData(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     crop_name = Column(String(100), nullable=False)
+    crop_key = Column(String(100), nullable=True)  # normalize_crop_key(crop_name)
     market_name = Column(String(100), nullable=False)
     location = Column(String(100), nullable=False)
     price_per_kg = Column(Float, nullable=False)
     date = Column(DateTime, nullable=False)
     quality_grade = Column(String(20), nullable=True)  # A, B, C
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    @validates("crop_name")
+    def _set_crop_key(self, key, crop_name):
+        self.crop_key = normalize_crop_key(crop_name)
+        return crop_name
+
+Index("ix_market_data_crop_key_date", MarketData.crop_key, MarketData.date.desc())
+# Upsert target for bulk price ingestion: one price per crop, market and day
+Index("uq_market_data_crop_market_date", MarketData.crop_key, MarketData.market_name, MarketData.date, unique=True)
+
+class MarketPriceSummary(Base):
+    __tablename__ = "market_price_summaries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    crop_key = Column(String(100), unique=True, index=True, nullable=False)  # normalized crop name
+    crop_name = Column(String(100), nullable=False)  # display name of the latest price point
+    recent_prices = Column(JSON, nullable=False, default=list)  # newest first, capped window
+    data_points = Column(Integer, nullable=False, default=0)
+    latest_price = Column(Float, nullable=True)
+    latest_date = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 class Notification(Base):
     __tablename__ = "notifications"
@@ -136,8 +203,38 @@ class Notification(Base):
     priority = Column(String(20), default="medium")  # low, medium, high
     is_sent = Column(Boolean, default=False)
     sent_at = Column(DateTime, nullable=True)
+    # Outbox state for services/notification_dispatcher.py; rows with no
+    # next_attempt_at are never dispatched
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    broadcast_id = Column(Integer, ForeignKey("notification_broadcasts.id"), nullable=True)
+    # Coalescing (services/notification_coalescing.py): repeats of the same
+    # alert before coalesce_until are counted here instead of stored
+    dedupe_key = Column(String(40), nullable=True)
+    coalesce_until = Column(DateTime, nullable=True)
+    suppressed_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     farmer = relationship("Farmer", back_populates="notifications")
 
+Index("ix_notifications_farmer_created", Notification.farmer_id, Notification.created_at.desc())
+Index("ix_notifications_outbox", Notification.is_sent, Notification.next_attempt_at)
+Index("ix_notifications_broadcast", Notification.broadcast_id, Notification.is_sent)
+Index("ix_notifications_dedupe", Notification.farmer_id, Notification.dedupe_key)
+
+class NotificationBroadcast(Base):
+    """A region-wide alert fanned out as one Notification per farmer"""
+    __tablename__ = "notification_broadcasts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    message = Column(Text, nullable=False)
+    notification_type = Column(String(50), nullable=False)
+    priority = Column(String(20), default="medium")
+    state = Column(String(50), nullable=False)
+    district = Column(String(50), nullable=True)
+    village = Column(String(50), nullable=True)
+    target_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False)
+
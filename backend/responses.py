@@ -0,0 +1,133 @@
+"""
+Fast JSON responses for hot endpoints.
+
+Routes that already hold plain dicts or ORM rows return ``fast_json`` /
+``row_payload`` output directly instead of a Pydantic model, which skips
+FastAPI's response_model re-validation. ``response_model`` stays on the
+route for the OpenAPI schema. orjson is used when installed (FAST_JSON);
+otherwise the stdlib encoder.
+
+``cached_json`` adds an ETag and Cache-Control to a read response and
+answers a matching If-None-Match with 304 Not Modified.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None  # type: ignore
+
+FAST_JSON = os.getenv("FAST_JSON", "true").lower() == "true" and orjson is not None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    # numpy scalars from model output
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if FAST_JSON:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps(content: Any) -> bytes:
+        return json.dumps(content, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def fast_json(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> FastJSONResponse:
+    return FastJSONResponse(content=content, status_code=status_code, headers=headers)
+
+
+_row_fields: Dict[Type[BaseModel], List[str]] = {}
+
+
+def row_serializer(schema: Type[BaseModel]) -> Callable[[Any], Dict[str, Any]]:
+    """Build dicts with ``schema``'s fields straight from ORM rows or dicts"""
+    fields = _row_fields.get(schema)
+    if fields is None:
+        fields = _row_fields[schema] = list(schema.model_fields)
+
+    def serialize(row: Any) -> Dict[str, Any]:
+        if isinstance(row, dict):
+            return {field: row.get(field) for field in fields}
+        return {field: getattr(row, field, None) for field in fields}
+
+    return serialize
+
+
+def row_payload(rows: Iterable[Any], schema: Type[BaseModel]) -> List[Dict[str, Any]]:
+    serialize = row_serializer(schema)
+    return [serialize(row) for row in rows]
+
+
+def etag_for(body: bytes) -> str:
+    """Weak validator for a rendered body; weak so it survives compression"""
+    return 'W/"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+def cache_control(max_age: int, private: bool = True, stale_while_revalidate: int = 0) -> str:
+    """Cache-Control value; private responses may be kept by the client but not shared caches"""
+    value = f"{'private' if private else 'public'}, max-age={max_age}"
+    if stale_while_revalidate:
+        value += f", stale-while-revalidate={stale_while_revalidate}"
+    return value
+
+
+def cached_json(
+    request: Request,
+    content: Any,
+    max_age: int,
+    private: bool = True,
+    stale_while_revalidate: int = 0,
+) -> Response:
+    """JSON response with ETag/Cache-Control, or 304 when the client's copy is current"""
+    body = dumps(content)
+    headers = {
+        "ETag": etag_for(body),
+        "Cache-Control": cache_control(max_age, private, stale_while_revalidate),
+    }
+    if private:
+        # Authenticated responses differ per bearer token
+        headers["Vary"] = "Authorization"
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
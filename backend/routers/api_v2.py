@@ -1,17 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request
 from sqlalchemy.orm import Session
 from typing import Dict, Any
-from database import get_db
+from database import AsyncDB, get_async_db, get_db
 from models import Farmer
 from auth import get_current_farmer
-from services.ml_service import MLService
+from responses import cached_json
+from services.ml_service import get_ml_service
+from services.market_summary import get_all_summaries, summarize_trends
 from services import ModelNotReadyError
 import os
 import uuid
 
 router = APIRouter()
 
-ml_service = MLService()
+ml_service = get_ml_service()
+
+# Public, non-personalized responses may be shared by nginx and other caches
+# (see proxy_cache in nginx.conf); stale copies are served while refreshing
+PUBLIC_CACHE_MAX_AGE = int(os.getenv("PUBLIC_CACHE_MAX_AGE", "30"))
+PUBLIC_CACHE_STALE_SECONDS = int(os.getenv("PUBLIC_CACHE_STALE_SECONDS", "60"))
+
+def _public_json(request: Request, content: Any):
+    return cached_json(
+        request, content, PUBLIC_CACHE_MAX_AGE, private=False,
+        stale_while_revalidate=PUBLIC_CACHE_STALE_SECONDS
+    )
+
+def _faq_answer(question: str) -> Dict[str, Any]:
+    if not question:
+        raise HTTPException(status_code=400, detail='question is required')
+    # Placeholder: a fine-tuned DistilBERT would be used; here echo
+    return { 'answer': f"This is a placeholder answer for: {question}" }
 
 def _ensure_models_ready():
     if not (ml_service.crop_model and ml_service.yield_model and ml_service.fertilizer_model):
@@ -94,21 +113,28 @@ async def pest_detect(file: UploadFile = File(...)):
     return ml_service.detect_pest_disease(path, 'pest')
 
 @router.get("/market/{commodity}")
-async def market_prices(commodity: str):
+async def market_prices(commodity: str, request: Request):
     # Placeholder: trained price model would provide historical + forecast
-    return {
+    return _public_json(request, {
         'commodity': commodity,
         'historical_points': 60,
         'forecast': [{ 'date_offset_days': i*7, 'price': 100 + i*2 } for i in range(1, 5)]
-    }
+    })
+
+@router.get("/trends")
+async def market_trends(request: Request, db: AsyncDB = Depends(get_async_db)):
+    """Public market trends for all crops (same data as /api/market/trends)"""
+    summaries = await db.run(get_all_summaries)
+    return _public_json(request, summarize_trends(summaries))
+
+@router.get("/faq")
+async def faq_lookup(request: Request, question: str = ''):
+    """Cacheable variant of POST /faq for repeated questions"""
+    return _public_json(request, _faq_answer(question.strip()))
 
 @router.post("/faq")
 async def faq_chatbot(query: Dict[str, Any]):
-    # Placeholder: a fine-tuned DistilBERT would be used; here echo
-    question = query.get('question', '')
-    if not question:
-        raise HTTPException(status_code=400, detail='question is required')
-    return { 'answer': f"This is a placeholder answer for: {question}" }
+    return _faq_answer(query.get('question', ''))
 
 
 
@@ -1,51 +1,132 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from database import get_db
+from database import AsyncDB, get_async_db
 from models import Farmer
-from schemas import FarmerCreate, FarmerLogin, Token, FarmerResponse
-from auth import verify_password, get_password_hash, create_access_token, get_current_farmer
+from schemas import (
+    FarmerCreate, FarmerLogin, Token, FarmerResponse, BulkRegistrationResult, BulkRegistrationError
+)
+from auth import (
+    verify_password_async, get_password_hash_async, get_password_hashes_bulk, create_access_token,
+    get_current_farmer, require_admin
+)
+from services.db_writer import db_writer
 from datetime import timedelta
+from typing import Any, Dict, List, Set, Tuple
+import csv
+import io
 
 router = APIRouter()
 
-@router.post("/register", response_model=FarmerResponse)
-async def register_farmer(farmer: FarmerCreate, db: Session = Depends(get_db)):
-    # Check if farmer already exists
-    existing_farmer = db.query(Farmer).filter(
-        (Farmer.email == farmer.email) | (Farmer.phone == farmer.phone)
-    ).first()
-    
-    if existing_farmer:
-        raise HTTPException(
-            status_code=400,
-            detail="Farmer with this email or phone already exists"
-        )
-    
-    # Create new farmer
-    hashed_password = get_password_hash(farmer.password)
-    db_farmer = Farmer(
-        name=farmer.name,
-        email=farmer.email,
-        phone=farmer.phone,
-        location=farmer.location,
-        state=farmer.state,
-        district=farmer.district,
-        village=farmer.village,
-        hashed_password=hashed_password
-    )
-    
+DUPLICATE_FARMER_DETAIL = "Farmer with this email or phone already exists"
+
+# Rows hashed and inserted per round trip during bulk registration
+BULK_REGISTRATION_BATCH_SIZE = 500
+
+def _insert_farmer(db: Session, values: Dict[str, Any]) -> Farmer:
+    db_farmer = Farmer(**values)
     db.add(db_farmer)
-    db.commit()
+    db.flush()
     db.refresh(db_farmer)
-    
     return db_farmer
 
+def _insert_farmers_ignoring_conflicts(db: Session, rows: List[Dict[str, Any]]) -> int:
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    # No conflict target: skip rows clashing with either the email or phone unique index
+    stmt = insert(Farmer).on_conflict_do_nothing().returning(Farmer.id)
+    return len(db.execute(stmt, rows).all())
+
+def _existing_identities(db: Session, emails: List[str], phones: List[str]) -> Tuple[Set[str], Set[str]]:
+    """Emails and phones from the lists that are already registered"""
+    existing_emails = {email for (email,) in db.query(Farmer.email).filter(Farmer.email.in_(emails))}
+    existing_phones = {phone for (phone,) in db.query(Farmer.phone).filter(Farmer.phone.in_(phones))}
+    return existing_emails, existing_phones
+
+def _farmer_values(farmer: FarmerCreate, hashed_password: str) -> Dict[str, Any]:
+    return {
+        'name': farmer.name,
+        'email': farmer.email,
+        'phone': farmer.phone,
+        'location': farmer.location,
+        'state': farmer.state,
+        'district': farmer.district,
+        'village': farmer.village,
+        'hashed_password': hashed_password,
+        'is_active': True,
+    }
+
+@router.post("/register", response_model=FarmerResponse)
+async def register_farmer(farmer: FarmerCreate):
+    # Single insert; the unique email/phone indexes reject duplicates atomically
+    values = _farmer_values(farmer, await get_password_hash_async(farmer.password))
+    try:
+        return await db_writer.run(_insert_farmer, values)
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail=DUPLICATE_FARMER_DETAIL)
+
+@router.post("/register/bulk", response_model=BulkRegistrationResult)
+async def bulk_register_farmers(
+    file: UploadFile = File(...), _: None = Depends(require_admin), db: AsyncDB = Depends(get_async_db)
+):
+    """Import farmers from an enrollment-drive CSV.
+
+    Expects a header row with the FarmerCreate fields (name, email, phone,
+    location, state, district, village, password). Rows are validated,
+    hashed on a separate bulk pool (so logins are not held up) and inserted
+    in batches; farmers whose email or phone already exists are skipped
+    before hashing.
+    """
+    content = (await file.read()).decode('utf-8-sig')
+    result = BulkRegistrationResult(total_rows=0, inserted=0, skipped_existing=0, invalid=[])
+    batch: List[FarmerCreate] = []
+
+    async def flush(batch: List[FarmerCreate]):
+        emails, phones = await db.run(
+            _existing_identities, [f.email for f in batch], [f.phone for f in batch]
+        )
+        new = []
+        for farmer in batch:
+            # Also catches repeats within the CSV itself
+            if farmer.email in emails or farmer.phone in phones:
+                continue
+            emails.add(farmer.email)
+            phones.add(farmer.phone)
+            new.append(farmer)
+        hashes = await get_password_hashes_bulk([f.password for f in new])
+        rows = [_farmer_values(f, hashed) for f, hashed in zip(new, hashes)]
+        # Conflicts with rows inserted since the lookup are still skipped here
+        inserted = await db_writer.run(_insert_farmers_ignoring_conflicts, rows) if rows else 0
+        result.inserted += inserted
+        result.skipped_existing += len(batch) - inserted
+
+    # Header is line 1, so data rows start at 2
+    for line_number, row in enumerate(csv.DictReader(io.StringIO(content)), start=2):
+        result.total_rows += 1
+        try:
+            batch.append(FarmerCreate(**{k.strip(): (v or '').strip() or None for k, v in row.items() if k}))
+        except ValidationError as e:
+            result.invalid.append(BulkRegistrationError(row=line_number, error=str(e.errors()[0]['msg'])))
+            continue
+        if len(batch) >= BULK_REGISTRATION_BATCH_SIZE:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    return result
+
+def _get_farmer_by_email(db: Session, email: str):
+    return db.query(Farmer).filter(Farmer.email == email).first()
+
 @router.post("/login", response_model=Token)
-async def login_farmer(farmer: FarmerLogin, db: Session = Depends(get_db)):
+async def login_farmer(farmer: FarmerLogin, db: AsyncDB = Depends(get_async_db)):
     # Authenticate farmer
-    farmer_db = db.query(Farmer).filter(Farmer.email == farmer.email).first()
+    farmer_db = await db.run(_get_farmer_by_email, farmer.email)
     
-    if not farmer_db or not verify_password(farmer.password, farmer_db.hashed_password):
+    if not farmer_db or not await verify_password_async(farmer.password, farmer_db.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -1,87 +1,240 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import case, exists, func, insert, literal, select, update
+from sqlalchemy.orm import aliased
 from sqlalchemy.orm import Session
-from database import get_db
-from models import Farmer, Notification
-from schemas import NotificationCreate, NotificationResponse
-from auth import get_current_farmer
-from twilio.rest import Client
-import os
+from database import AsyncDB, get_async_db
+from models import Farmer, Notification, NotificationBroadcast
+from schemas import NotificationCreate, NotificationResponse, BroadcastCreate, BroadcastProgress
+from auth import get_current_farmer, require_admin
+from services.db_writer import db_writer
+from services.notification_dispatcher import notification_dispatcher, outbox_stats
+from services.notification_coalescing import coalesce_until, dedupe_key, find_duplicate, first_attempt_at
+from routers.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page, paginated_response
+from responses import fast_json, row_payload
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, List, Optional
 
 router = APIRouter()
 
-# Twilio configuration
-TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
-TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
-TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
+def _create_notification(db: Session, farmer_id: int, notification: NotificationCreate, queue: bool) -> Notification:
+    now = datetime.now()
+    key = dedupe_key(notification.notification_type, notification.message)
+    duplicate = find_duplicate(db, farmer_id, key, now)
+    if duplicate is not None:
+        # Same alert already stored (and sent or queued): count it instead,
+        # incrementing in SQL so concurrent requests from other workers add up
+        db.execute(
+            update(Notification)
+            .where(Notification.id == duplicate.id)
+            .values(suppressed_count=Notification.suppressed_count + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.refresh(duplicate)
+        return duplicate
+
+    db_notification = Notification(
+        farmer_id=farmer_id,
+        message=notification.message,
+        notification_type=notification.notification_type,
+        priority=notification.priority,
+        dedupe_key=key,
+        coalesce_until=coalesce_until(now),
+        # Picked up by the dispatcher; left unset when SMS is disabled
+        next_attempt_at=first_attempt_at(notification.priority, now) if queue else None
+    )
+    db.add(db_notification)
+    db.flush()
+    db.refresh(db_notification)
+    return db_notification
+
+def _create_broadcast(db: Session, broadcast: BroadcastCreate, queue: bool) -> NotificationBroadcast:
+    now = datetime.now()
+    db_broadcast = NotificationBroadcast(
+        message=broadcast.message,
+        notification_type=broadcast.notification_type,
+        priority=broadcast.priority,
+        state=broadcast.state,
+        district=broadcast.district,
+        village=broadcast.village,
+        created_at=now
+    )
+    db.add(db_broadcast)
+    db.flush()
+
+    key = dedupe_key(broadcast.notification_type, broadcast.message)
+    targets = select(
+        Farmer.id,
+        literal(broadcast.message),
+        literal(broadcast.notification_type),
+        literal(broadcast.priority),
+        literal(False),
+        literal(first_attempt_at(broadcast.priority, now) if queue else None, Notification.next_attempt_at.type),
+        literal(db_broadcast.id),
+        literal(key),
+        literal(coalesce_until(now), Notification.coalesce_until.type),
+    ).where(
+        Farmer.is_active == True,
+        Farmer.state == broadcast.state,
+        # Same rule as /send: farmers without a phone cannot be reached by SMS
+        Farmer.phone.isnot(None),
+        Farmer.phone != "",
+    )
+    if broadcast.district:
+        targets = targets.where(Farmer.district == broadcast.district)
+    if broadcast.village:
+        targets = targets.where(Farmer.village == broadcast.village)
+
+    if coalesce_until(now) is not None:
+        # Farmers who already have this alert in its dedupe window get it
+        # counted on their existing notification instead of a new one
+        open_duplicate = aliased(Notification)
+        duplicate_open = (open_duplicate.dedupe_key == key) & (open_duplicate.coalesce_until > now)
+        db.execute(
+            update(Notification)
+            .where(
+                Notification.dedupe_key == key,
+                Notification.coalesce_until > now,
+                Notification.farmer_id.in_(targets.with_only_columns(Farmer.id).scalar_subquery()),
+            )
+            .values(suppressed_count=Notification.suppressed_count + 1)
+            .execution_options(synchronize_session=False)
+        )
+        targets = targets.where(~exists().where(open_duplicate.farmer_id == Farmer.id, duplicate_open))
 
-# Initialize Twilio client if credentials are available
-if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN:
-    twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-else:
-    twilio_client = None
+    # One INSERT ... SELECT fans the alert out without loading farmers
+    result = db.execute(insert(Notification).from_select(
+        ["farmer_id", "message", "notification_type", "priority", "is_sent", "next_attempt_at", "broadcast_id",
+         "dedupe_key", "coalesce_until"],
+        targets
+    ))
+    db_broadcast.target_count = result.rowcount
+    return db_broadcast
+
+def _broadcast_progress(db: Session, broadcast_id: int) -> Optional[Dict[str, Any]]:
+    broadcast = db.get(NotificationBroadcast, broadcast_id)
+    if broadcast is None:
+        return None
+    sent, failed, first_sent, last_sent = db.query(
+        func.count(case((Notification.is_sent == True, 1))),
+        # Given up after at least one attempt; rows never queued (SMS disabled) are not failures
+        func.count(case((
+            (Notification.is_sent == False) & Notification.next_attempt_at.is_(None) & (Notification.attempts > 0), 1
+        ))),
+        func.min(Notification.sent_at),
+        func.max(Notification.sent_at),
+    ).filter(Notification.broadcast_id == broadcast_id).one()
+
+    # Throughput over the delivery window; elapsed runs until the last send
+    # once nothing is pending
+    pending = broadcast.target_count - sent - failed
+    end = last_sent if pending == 0 and last_sent else datetime.now()
+    elapsed = max((end - broadcast.created_at).total_seconds(), 0.0)
+    window = (last_sent - first_sent).total_seconds() if first_sent and last_sent else 0.0
+    return {
+        'id': broadcast.id,
+        'message': broadcast.message,
+        'notification_type': broadcast.notification_type,
+        'state': broadcast.state,
+        'district': broadcast.district,
+        'village': broadcast.village,
+        'target_count': broadcast.target_count,
+        'sent': sent,
+        'failed': failed,
+        'pending': pending,
+        'created_at': broadcast.created_at,
+        'elapsed_seconds': round(elapsed, 2),
+        'throughput_per_second': round(sent / window, 2) if window > 0 else float(sent),
+    }
 
 @router.post("/send", response_model=NotificationResponse)
 async def send_notification(
     notification: NotificationCreate,
-    current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    current_farmer: Farmer = Depends(get_current_farmer)
 ):
-    """Send notification to farmer"""
+    """Send notification to farmer.
+
+    The notification is stored in the outbox and delivered by SMS in the
+    background; ``is_sent`` flips once the provider accepts it. Repeats of
+    an alert within the dedupe window return the original notification with
+    its ``suppressed_count`` incremented.
+    """
     try:
-        # Create notification record
-        db_notification = Notification(
-            farmer_id=current_farmer.id,
-            message=notification.message,
-            notification_type=notification.notification_type,
-            priority=notification.priority
-        )
+        # Create notification record through the database writer
+        queue = notification_dispatcher.enabled and bool(current_farmer.phone)
+        db_notification = await db_writer.run(_create_notification, current_farmer.id, notification, queue)
+        if queue:
+            notification_dispatcher.wake()
         
-        db.add(db_notification)
-        db.commit()
-        db.refresh(db_notification)
-        
-        # Send SMS if Twilio is configured
-        if twilio_client and current_farmer.phone:
-            try:
-                message = twilio_client.messages.create(
-                    body=notification.message,
-                    from_=TWILIO_PHONE_NUMBER,
-                    to=current_farmer.phone
-                )
-                
-                # Update notification status
-                db_notification.is_sent = True
-                db_notification.sent_at = datetime.now()
-                db.commit()
-                
-            except Exception as e:
-                print(f"Failed to send SMS: {str(e)}")
-        
-        return db_notification
+        return fast_json(row_payload([db_notification], NotificationResponse)[0])
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error sending notification: {str(e)}")
 
 @router.get("/history")
 async def get_notification_history(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
-    """Get farmer's notification history"""
-    notifications = db.query(Notification).filter(
-        Notification.farmer_id == current_farmer.id
-    ).order_by(Notification.created_at.desc()).all()
+    """Get farmer's notification history, newest first.
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to fetch
+    the next page.
+    """
+    notifications, next_cursor = await db.run(
+        keyset_page, Notification, cursor, limit, Notification.farmer_id == current_farmer.id
+    )
     
-    return notifications
+    return paginated_response(notifications, NotificationResponse, next_cursor)
 
-@router.post("/weather-alert")
+@router.post("/broadcast", response_model=BroadcastProgress, status_code=202)
+async def create_broadcast(broadcast: BroadcastCreate, _: None = Depends(require_admin)):
+    """Alert every active farmer in a state, district or village.
+
+    Notifications are inserted in bulk and delivered in the background;
+    poll ``GET /broadcast/{id}`` for progress.
+    """
+    db_broadcast = await db_writer.run(_create_broadcast, broadcast, notification_dispatcher.enabled)
+    notification_dispatcher.wake()
+    return BroadcastProgress(
+        **{column: getattr(db_broadcast, column) for column in (
+            'id', 'message', 'notification_type', 'state', 'district', 'village', 'target_count', 'created_at'
+        )},
+        sent=0,
+        failed=0,
+        pending=db_broadcast.target_count,
+        elapsed_seconds=0.0,
+        throughput_per_second=0.0
+    )
+
+@router.get("/broadcast/{broadcast_id}", response_model=BroadcastProgress)
+async def get_broadcast_progress(
+    broadcast_id: int,
+    _: None = Depends(require_admin),
+    db: AsyncDB = Depends(get_async_db)
+):
+    """Delivery progress and throughput of a broadcast"""
+    progress = await db.run(_broadcast_progress, broadcast_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    return progress
+
+@router.get("/dispatcher")
+async def get_dispatcher_stats(_: None = Depends(require_admin), db: AsyncDB = Depends(get_async_db)):
+    """Outbox state from the database, plus this process's dispatcher counters.
+
+    The dispatcher usually runs in a separate process
+    (jobs/dispatch_notifications.py), in which case ``running`` is false
+    here and ``outbox`` is the figure to watch.
+    """
+    return {**notification_dispatcher.stats(), 'outbox': await db.run(outbox_stats)}
+
+@router.post("/weather-alert", response_model=NotificationResponse)
 async def send_weather_alert(
     location: str,
     alert_type: str,
-    current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    current_farmer: Farmer = Depends(get_current_farmer)
 ):
     """Send weather alert to farmer"""
     try:
@@ -102,17 +255,16 @@ async def send_weather_alert(
             priority="high"
         )
         
-        return await send_notification(notification, current_farmer, db)
+        return await send_notification(notification, current_farmer)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error sending weather alert: {str(e)}")
 
-@router.post("/market-alert")
+@router.post("/market-alert", response_model=NotificationResponse)
 async def send_market_alert(
     crop_name: str,
     price_change: str,
-    current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    current_farmer: Farmer = Depends(get_current_farmer)
 ):
     """Send market price alert to farmer"""
     try:
@@ -124,7 +276,7 @@ async def send_market_alert(
             priority="medium"
         )
         
-        return await send_notification(notification, current_farmer, db)
+        return await send_notification(notification, current_farmer)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error sending market alert: {str(e)}")
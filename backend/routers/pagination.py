@@ -0,0 +1,72 @@
+import base64
+from typing import Any, Callable, Iterable, List, Optional, Tuple, Type
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from responses import dumps, row_serializer
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(row_id: int) -> str:
+    return base64.urlsafe_b64encode(str(row_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(db: Session, model, cursor: Optional[str], limit: int, *criteria) -> Tuple[List[Any], Optional[str]]:
+    """Fetch one newest-first page of ``model`` rows ordered by (created_at, id).
+
+    The cursor is the id of the last row of the previous page. Its created_at
+    is read back with a scalar subquery so the comparison uses the stored
+    value, which keeps the (farmer_id, created_at DESC) index usable.
+    """
+    query = db.query(model).filter(*criteria)
+    if cursor is not None:
+        last_id = decode_cursor(cursor)
+        last_created = select(model.created_at).where(model.id == last_id).scalar_subquery()
+        query = query.filter(or_(
+            model.created_at < last_created,
+            and_(model.created_at == last_created, model.id < last_id),
+        ))
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].id)
+    return rows, None
+
+
+def _stream_json_array(rows: Iterable[Any], serialize: Callable[[Any], Any]):
+    yield "["
+    for i, row in enumerate(rows):
+        if i:
+            yield ","
+        yield dumps(serialize(row))
+    yield "]"
+
+
+def paginated_response(rows: List[Any], schema: Type[BaseModel], next_cursor: Optional[str]) -> StreamingResponse:
+    """Stream a page as a JSON array; the next cursor travels in a header.
+
+    Rows are serialized straight from their attributes with ``schema``'s
+    fields, without building a Pydantic model per row.
+    """
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    return StreamingResponse(
+        _stream_json_array(rows, row_serializer(schema)),
+        media_type="application/json",
+        headers=headers,
+    )
@@ -1,48 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from database import AsyncDB, get_async_db
 from models import Farmer, CropRecommendation
-from schemas import CropRecommendationRequest, CropRecommendationResponse
+from schemas import CropRecommendationRequest, CropRecommendationResponse, CropRecommendationRecord
 from auth import get_current_farmer
-from services.ml_service import MLService
+from services.ml_service import get_ml_service
+from services.batch_writer import BatchWriter
+from services.cache import TTLCache
+from services.recommendation_snapshots import get_snapshot, snapshot_key
+from services.weather_provider import weather_provider
 from routers.soil import get_soil_data
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
-import json
+from routers.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page, paginated_response
+from responses import cached_json, fast_json, row_payload
+from datetime import date, datetime, time, timedelta
+from typing import List, Dict, Any, Optional
+import copy
+import os
 
 router = APIRouter()
-ml_service = MLService()
+ml_service = get_ml_service()
+
+# Snapshot lookups per state/district/season, including misses
+_snapshots = TTLCache(
+    maxsize=4096,
+    ttl=float(os.getenv("RECOMMENDATION_SNAPSHOT_CACHE_TTL", "300")),
+    name="recommendation_snapshots",
+)
+_NO_SNAPSHOT = object()
+
+# Client cache lifetime for district recommendations; revalidated by ETag after
+RECOMMENDATION_CACHE_MAX_AGE = int(os.getenv("RECOMMENDATION_CACHE_MAX_AGE", "900"))
+
+# Recommendation history is written in deferred batches, after the response
+recommendation_writer = BatchWriter(CropRecommendation)
 
-# Minimal weather data provider to replace missing routers.weather module
 async def get_weather_data(location: str, state: str, district: str) -> Dict[str, Any]:
-    try:
-        # Return sample weather data; replace with real API integration as needed
-        return {
-            'temperature': 26.0,
-            'humidity': 70.0,
-            'rainfall': 950.0,
-            'wind_speed': 8.5,
-            'pressure': 1012.0,
-            'weather_condition': 'Partly Cloudy'
-        }
-    except Exception:
-        return {
-            'temperature': 25.0,
-            'humidity': 65.0,
-            'rainfall': 800.0,
-            'wind_speed': 6.0,
-            'pressure': 1010.0,
-            'weather_condition': 'Clear'
-        }
+    """Current weather for the farmer's district (cached, see services/weather_provider.py)"""
+    return await weather_provider.get(location, state, district)
 
-@router.post("/crops", response_model=List[CropRecommendationResponse])
-async def get_crop_recommendations(
-    request: CropRecommendationRequest,
-    current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
-):
-    """Get crop recommendations based on location, soil, and weather data"""
-    try:
+def _recommendation_rows(farmer_id: int, recommendations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{
+        'farmer_id': farmer_id,
+        'crop_name': rec['crop_name'],
+        'confidence_score': rec['confidence_score'],
+        'expected_yield': rec['expected_yield'],
+        'expected_profit': rec['expected_profit'],
+        'sustainability_score': rec['sustainability_score'],
+        'fertilizer_recommendation': rec.get('fertilizer_recommendation'),
+        'planting_date': rec['planting_date'],
+        'harvesting_date': rec['harvesting_date'],
+    } for rec in recommendations]
+
+def _personalize(recommendations: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Per-farmer part of a recommendation: the planting calendar from today"""
+    now = now or datetime.now()
+    for rec in recommendations:
+        rec.setdefault('fertilizer_recommendation', None)
+        rec['planting_date'] = now + timedelta(days=7)
+        rec['harvesting_date'] = now + timedelta(days=120)
+    return recommendations
+
+async def _lookup_snapshot(db: AsyncDB, request: CropRecommendationRequest) -> Optional[List[Dict[str, Any]]]:
+    key = snapshot_key(request.state, request.district, request.season)
+    cached = _snapshots.get(key)
+    if cached is None:
+        cached = await db.run(get_snapshot, request.state, request.district, request.season)
+        _snapshots.set(key, _NO_SNAPSHOT if cached is None else cached)
+    if cached is _NO_SNAPSHOT:
+        return None
+    # Callers get their own copy of the shared cached snapshot
+    return copy.deepcopy(cached)
+
+async def _district_recommendations(db: AsyncDB, request: CropRecommendationRequest) -> List[Dict[str, Any]]:
+    """Snapshot recommendations for the district and season, else computed live"""
+    recommendations = await _lookup_snapshot(db, request)
+    if recommendations is None:
         # Get soil data for the location
         soil_data = await get_soil_data(request.location, request.state, request.district)
         
@@ -53,38 +84,75 @@ async def get_crop_recommendations(
         recommendations = ml_service.get_crop_recommendations(
             soil_data, weather_data, request.season, request.state
         )
+    return recommendations
+
+@router.post("/crops", response_model=List[CropRecommendationResponse])
+async def get_crop_recommendations(
+    request: CropRecommendationRequest,
+    current_farmer: Farmer = Depends(get_current_farmer),
+    db: AsyncDB = Depends(get_async_db)
+):
+    """Get crop recommendations based on location, soil, and weather data.
+
+    Served from the district/season snapshot built by
+    jobs/refresh_recommendation_snapshots.py when one is fresh; otherwise
+    computed live.
+    """
+    try:
+        recommendations = await _district_recommendations(db, request)
+        recommendations = _personalize(recommendations)
         
-        # Save recommendations to database
-        for rec in recommendations:
-            db_recommendation = CropRecommendation(
-                farmer_id=current_farmer.id,
-                crop_name=rec['crop_name'],
-                confidence_score=rec['confidence_score'],
-                expected_yield=rec['expected_yield'],
-                expected_profit=rec['expected_profit'],
-                sustainability_score=rec['sustainability_score'],
-                fertilizer_recommendation=json.dumps(rec['fertilizer_recommendation']),
-                planting_date=datetime.now() + timedelta(days=7),
-                harvesting_date=datetime.now() + timedelta(days=120)
-            )
-            db.add(db_recommendation)
+        # Queue recommendations for the next batched history insert
+        recommendation_writer.add(_recommendation_rows(current_farmer.id, recommendations))
         
-        db.commit()
+        # Built by this module, so returned without response_model re-validation
+        return fast_json(row_payload(recommendations, CropRecommendationResponse))
         
-        return recommendations
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting recommendations: {str(e)}")
+
+@router.get("/district", response_model=List[CropRecommendationResponse])
+async def get_district_recommendations(
+    request: Request,
+    state: str,
+    district: str,
+    season: str,
+    current_farmer: Farmer = Depends(get_current_farmer),
+    db: AsyncDB = Depends(get_async_db)
+):
+    """District-level crop recommendations for a season.
+
+    Unlike ``POST /crops`` nothing is recorded in the farmer's history and
+    the planting calendar starts from today's date, so the response only
+    changes when the district's inputs or the day change. Responses carry
+    an ETag; send it back as If-None-Match to get 304 Not Modified.
+    """
+    try:
+        lookup = CropRecommendationRequest(location=district, state=state, district=district, season=season)
+        recommendations = await _district_recommendations(db, lookup)
+        recommendations = _personalize(recommendations, now=datetime.combine(date.today(), time.min))
+        return cached_json(
+            request, row_payload(recommendations, CropRecommendationResponse), RECOMMENDATION_CACHE_MAX_AGE
+        )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting recommendations: {str(e)}")
 
 @router.get("/history")
 async def get_recommendation_history(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
-    """Get farmer's recommendation history"""
-    recommendations = db.query(CropRecommendation).filter(
-        CropRecommendation.farmer_id == current_farmer.id
-    ).order_by(CropRecommendation.created_at.desc()).all()
+    """Get farmer's recommendation history, newest first.
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to fetch
+    the next page.
+    """
+    recommendations, next_cursor = await db.run(
+        keyset_page, CropRecommendation, cursor, limit, CropRecommendation.farmer_id == current_farmer.id
+    )
     
-    return recommendations
+    return paginated_response(recommendations, CropRecommendationRecord, next_cursor)
 
@@ -1,97 +1,129 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from database import get_db
-from models import SoilData, Farmer
+from database import AsyncDB, get_async_db
+from models import SoilData, Farmer, normalize_region_key
 from schemas import SoilDataResponse
 from auth import get_current_farmer
-import requests
+from routers.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page, paginated_response
+from services.cache import TTLCache
+from services.db_writer import db_writer
+from services.soil_provider import get_soil_grid, parse_coordinates
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 
 router = APIRouter()
 
-async def get_soil_data(location: str, state: str, district: str) -> Dict[str, Any]:
-    """Get soil data from external API or return sample data"""
-    try:
-        # Try to get data from SoilGrids API (simplified)
-        # In a real implementation, you would use proper API calls
-        sample_soil_data = {
-            'ph': 6.8,
-            'nitrogen': 45.2,
-            'phosphorus': 28.5,
-            'potassium': 38.7,
-            'organic_matter': 2.8,
-            'moisture': 65.0,
-            'temperature': 26.5,
-            'soil_type': 'Clay Loam'
-        }
-        
-        # You can integrate with real APIs like:
-        # - SoilGrids API
-        # - Bhuvan API
-        # - Local soil databases
-        
-        return sample_soil_data
-        
-    except Exception as e:
-        # Return default values if API fails
-        return {
-            'ph': 6.5,
-            'nitrogen': 50.0,
-            'phosphorus': 30.0,
-            'potassium': 40.0,
-            'organic_matter': 2.5,
-            'moisture': 60.0,
-            'temperature': 25.0,
-            'soil_type': 'Loam'
-        }
+SOIL_COLUMNS = ('ph', 'nitrogen', 'phosphorus', 'potassium', 'organic_matter', 'moisture', 'temperature', 'soil_type')
+
+# Location-level soil values; the dataset changes only when the grid is rebuilt
+_soil_cache = TTLCache(
+    maxsize=16384,
+    ttl=float(os.getenv("SOIL_CACHE_TTL", "3600")),
+    name="soil_data",
+)
+
+# Default values when no soil grid covers the location
+SAMPLE_SOIL_DATA = {
+    'ph': 6.8,
+    'nitrogen': 45.2,
+    'phosphorus': 28.5,
+    'potassium': 38.7,
+    'organic_matter': 2.8,
+    'moisture': 65.0,
+    'temperature': 26.5,
+    'soil_type': 'Clay Loam'
+}
+
+def _soil_cache_key(location: str, state: str, district: str, latitude: Optional[float], longitude: Optional[float]):
+    return (normalize_region_key(location), normalize_region_key(state), normalize_region_key(district), latitude, longitude)
+
+def lookup_soil_data(location: str, state: str, district: str,
+                     latitude: Optional[float] = None, longitude: Optional[float] = None) -> Tuple[Dict[str, Any], str]:
+    """Soil values and their source ("dataset" or "api") for a location"""
+    if latitude is None or longitude is None:
+        latitude, longitude = parse_coordinates(location)
+    key = _soil_cache_key(location, state, district, latitude, longitude)
+    cached = _soil_cache.get(key)
+    if cached is not None:
+        return cached
+
+    grid = get_soil_grid()
+    values = grid.lookup(state, district, latitude, longitude) if grid is not None else None
+    if values:
+        # Cells may lack some properties; fill them from the defaults
+        result = ({**SAMPLE_SOIL_DATA, **values}, 'dataset')
+    else:
+        result = (dict(SAMPLE_SOIL_DATA), 'api')
+    _soil_cache.set(key, result)
+    return result
+
+async def get_soil_data(location: str, state: str, district: str,
+                        latitude: Optional[float] = None, longitude: Optional[float] = None) -> Dict[str, Any]:
+    """Get soil data for a location from the soil grid, or sample values"""
+    soil_data, _ = lookup_soil_data(location, state, district, latitude, longitude)
+    return dict(soil_data)
+
+def _store_soil_data(db: Session, farmer_id: int, location: str, soil_data: Dict[str, Any], source: str) -> SoilData:
+    # Repeated fetches for an unchanged location reuse the farmer's latest row
+    latest = db.query(SoilData).filter(
+        SoilData.farmer_id == farmer_id,
+        SoilData.location == location
+    ).order_by(SoilData.id.desc()).first()
+    if latest is not None and latest.source == source and all(
+        getattr(latest, field) == soil_data.get(field) for field in SOIL_COLUMNS
+    ):
+        return latest
+
+    db_soil_data = SoilData(
+        farmer_id=farmer_id,
+        location=location,
+        source=source,
+        **{field: soil_data.get(field) for field in SOIL_COLUMNS}
+    )
+    db.add(db_soil_data)
+    db.flush()
+    db.refresh(db_soil_data)
+    return db_soil_data
 
 @router.post("/fetch", response_model=SoilDataResponse)
 async def fetch_soil_data(
     location: str,
     state: str,
     district: str,
-    current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    current_farmer: Farmer = Depends(get_current_farmer)
 ):
-    """Fetch and store soil data for a location"""
+    """Fetch and store soil data for a location.
+
+    Pass ``latitude``/``longitude`` (or a "lat,lon" location) to use the
+    nearest soil grid cell instead of the district value.
+    """
     try:
         # Get soil data
-        soil_data = await get_soil_data(location, state, district)
-        
-        # Save to database
-        db_soil_data = SoilData(
-            farmer_id=current_farmer.id,
-            location=location,
-            ph=soil_data.get('ph'),
-            nitrogen=soil_data.get('nitrogen'),
-            phosphorus=soil_data.get('phosphorus'),
-            potassium=soil_data.get('potassium'),
-            organic_matter=soil_data.get('organic_matter'),
-            moisture=soil_data.get('moisture'),
-            temperature=soil_data.get('temperature'),
-            soil_type=soil_data.get('soil_type'),
-            source='api'
-        )
+        soil_data, source = lookup_soil_data(location, state, district, latitude, longitude)
         
-        db.add(db_soil_data)
-        db.commit()
-        db.refresh(db_soil_data)
-        
-        return db_soil_data
+        # Save to database unless the farmer already has this reading
+        return await db_writer.run(_store_soil_data, current_farmer.id, location, soil_data, source)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching soil data: {str(e)}")
 
 @router.get("/history")
 async def get_soil_history(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
-    """Get farmer's soil data history"""
-    soil_data = db.query(SoilData).filter(
-        SoilData.farmer_id == current_farmer.id
-    ).order_by(SoilData.created_at.desc()).all()
+    """Get farmer's soil data history, newest first.
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to fetch
+    the next page.
+    """
+    soil_data, next_cursor = await db.run(
+        keyset_page, SoilData, cursor, limit, SoilData.farmer_id == current_farmer.id
+    )
     
-    return soil_data
+    return paginated_response(soil_data, SoilDataResponse, next_cursor)
 
@@ -32,6 +32,16 @@ class FarmerResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class BulkRegistrationError(BaseModel):
+    row: int
+    error: str
+
+class BulkRegistrationResult(BaseModel):
+    total_rows: int
+    inserted: int
+    skipped_existing: int
+    invalid: List[BulkRegistrationError]
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -99,6 +109,22 @@ class CropRecommendationResponse(BaseModel):
     planting_date: Optional[datetime]
     harvesting_date: Optional[datetime]
 
+class CropRecommendationRecord(BaseModel):
+    id: int
+    farmer_id: int
+    crop_name: str
+    confidence_score: float
+    expected_yield: float
+    expected_profit: float
+    sustainability_score: float
+    fertilizer_recommendation: Optional[dict]
+    planting_date: Optional[datetime]
+    harvesting_date: Optional[datetime]
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
 # Detection schemas
 class DetectionResponse(BaseModel):
     type: str  # pest or disease
@@ -139,8 +165,29 @@ class NotificationResponse(BaseModel):
     priority: str
     is_sent: bool
     sent_at: Optional[datetime]
+    suppressed_count: int = 0
     created_at: datetime
     
     class Config:
         from_attributes = True
 
+class BroadcastCreate(NotificationCreate):
+    state: str
+    district: Optional[str] = None
+    village: Optional[str] = None
+
+class BroadcastProgress(BaseModel):
+    id: int
+    message: str
+    notification_type: str
+    state: str
+    district: Optional[str]
+    village: Optional[str]
+    target_count: int
+    sent: int
+    failed: int
+    pending: int
+    created_at: datetime
+    elapsed_seconds: float
+    throughput_per_second: float
+
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Production server for AI Crop Recommendation System
+
+Runs the app under gunicorn with uvicorn workers, one per available CPU
+(container CPU quotas included) unless WEB_CONCURRENCY is set. With
+PRELOAD_APP=true the app and its models are imported once in the master
+and shared copy-on-write by the forked workers. Workers are recycled after
+MAX_REQUESTS (+ jitter) requests. uvloop/httptools are used when installed.
+
+With more than one worker the notification dispatcher is turned off in the
+workers and run once, as jobs/dispatch_notifications.py next to them (its
+SMS rate limit is per process). DB_MAX_CONNECTIONS is split between the
+workers' pools. SQLite with the single-writer thread defaults to one
+worker, since that writer only serializes writes within a process.
+
+Without gunicorn (e.g. on Windows) it falls back to uvicorn's own
+multi-process mode, which imports the app in each worker and does not
+replace exited workers, so there is no preloading or recycling.
+
+    python backend/serve.py
+    WEB_CONCURRENCY=4 PRELOAD_APP=false python backend/serve.py
+"""
+
+import logging
+import math
+import os
+import subprocess
+import sys
+
+from dotenv import load_dotenv
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+load_dotenv()
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", 8000))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+# Import the app (and load models) before forking workers
+PRELOAD_APP = os.getenv("PRELOAD_APP", "true").lower() == "true"
+# Workers silent for longer than this are killed and replaced
+WORKER_TIMEOUT = int(os.getenv("WORKER_TIMEOUT", "120"))
+# Time given to in-flight requests on restart or shutdown
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# Longer than nginx's upstream keepalive_timeout, so nginx closes idle connections first
+KEEPALIVE = int(os.getenv("KEEPALIVE", "75"))
+# Recycle workers to bound memory growth; jitter avoids restarting them all at once
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "2000"))
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "200"))
+# auto picks uvloop / httptools when installed
+UVICORN_LOOP = os.getenv("UVICORN_LOOP", "auto")
+UVICORN_HTTP = os.getenv("UVICORN_HTTP", "auto")
+# Connections all workers may hold together (both engines with DB_ASYNC);
+# below PostgreSQL's default max_connections=100 to leave room for jobs
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "80"))
+
+logger = logging.getLogger("serve")
+
+
+def _cgroup_cpu_limit():
+    """CPU quota of the container (docker --cpus), if one is set"""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus() -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    return cpus
+
+
+# Read from the environment rather than imported: database.py sizes its
+# pools at import, which must happen after _split_connection_budget
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() == "true"
+
+
+def _single_writer_sqlite() -> bool:
+    # Same defaults as database.py and services/db_writer.py
+    if not os.getenv("DATABASE_URL", "sqlite:///./farmers.db").startswith("sqlite"):
+        return False
+    return _env_flag("DB_SINGLE_WRITER", str(_env_flag("SQLITE_PRODUCTION", "false")))
+
+
+def worker_count() -> int:
+    if "WEB_CONCURRENCY" in os.environ:
+        return int(os.environ["WEB_CONCURRENCY"])
+    if _single_writer_sqlite():
+        return 1
+    # Inference is CPU-bound in-process, so one worker per core
+    return available_cpus()
+
+
+def _split_connection_budget(workers: int):
+    """Cap each worker's pools so all of them together stay within DB_MAX_CONNECTIONS"""
+    if DB_MAX_CONNECTIONS <= 0:
+        return
+    engines = 2 if _env_flag("DB_ASYNC", "false") else 1
+    per_engine = max(1, DB_MAX_CONNECTIONS // (workers * engines))
+    # DB_POOL_SIZE / DB_MAX_OVERFLOW still cap each pool
+    pool_size = min(int(os.getenv("DB_POOL_SIZE", "10")), per_engine)
+    max_overflow = min(int(os.getenv("DB_MAX_OVERFLOW", "20")), per_engine - pool_size)
+    os.environ["DB_POOL_SIZE"] = str(pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+
+
+_dispatcher_process = None
+
+
+def _start_dispatcher():
+    """Run the notification dispatcher once, beside the workers"""
+    global _dispatcher_process
+    env = dict(os.environ, DISPATCHER_ENABLED="true")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [BACKEND_DIR, env.get("PYTHONPATH")]))
+    # Same working directory as the workers, so relative paths (SQLite) match
+    _dispatcher_process = subprocess.Popen([sys.executable, "-m", "jobs.dispatch_notifications"], env=env)
+
+
+def _stop_dispatcher(server=None):
+    if _dispatcher_process is not None and _dispatcher_process.poll() is None:
+        _dispatcher_process.terminate()
+        try:
+            _dispatcher_process.wait(GRACEFUL_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            _dispatcher_process.kill()
+
+
+def _limit_native_threads(workers: int):
+    """One BLAS/OpenMP thread per worker, so N workers don't each spawn N threads"""
+    if workers > 1:
+        for name in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "TF_NUM_INTRAOP_THREADS"):
+            os.environ.setdefault(name, "1")
+
+
+def post_fork(server, worker):
+    """Drop database connections inherited from the master; workers open their own"""
+    from database import async_engine, engine
+
+    engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+
+
+def _clear_metric_files():
+    """Clear metric files left by a previous run (prometheus_client multiprocess mode)"""
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(".db"):
+                os.remove(os.path.join(directory, name))
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        try:
+            from prometheus_client import multiprocess
+        except ImportError:
+            return
+        multiprocess.mark_process_dead(worker.pid)
+
+
+try:
+    from uvicorn.workers import UvicornWorker
+
+    class Worker(UvicornWorker):
+        CONFIG_KWARGS = {"loop": UVICORN_LOOP, "http": UVICORN_HTTP}
+except ImportError:  # gunicorn not installed
+    Worker = None
+
+
+def _run_gunicorn(workers: int):
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            settings = {
+                "bind": f"{HOST}:{PORT}",
+                "workers": workers,
+                "worker_class": "serve.Worker",
+                "pythonpath": BACKEND_DIR,
+                "preload_app": PRELOAD_APP,
+                "timeout": WORKER_TIMEOUT,
+                "graceful_timeout": GRACEFUL_TIMEOUT,
+                "keepalive": KEEPALIVE,
+                "max_requests": MAX_REQUESTS,
+                "max_requests_jitter": MAX_REQUESTS_JITTER,
+                "loglevel": LOG_LEVEL,
+                "accesslog": "-",
+                "post_fork": post_fork,
+                "child_exit": child_exit,
+                "on_exit": _stop_dispatcher,
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            return app
+
+    Application().run()
+
+
+def _run_uvicorn(workers: int):
+    import uvicorn
+
+    uvicorn.run(
+        "main:app",
+        host=HOST,
+        port=PORT,
+        app_dir=BACKEND_DIR,
+        workers=workers,
+        loop=UVICORN_LOOP,
+        http=UVICORN_HTTP,
+        timeout_keep_alive=KEEPALIVE,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        log_level=LOG_LEVEL,
+    )
+
+
+def main():
+    sys.path.insert(0, BACKEND_DIR)
+    workers = worker_count()
+    _limit_native_threads(workers)
+    _split_connection_budget(workers)
+    # Before the dispatcher starts, which writes its own metric files
+    _clear_metric_files()
+    if workers > 1:
+        if _single_writer_sqlite():
+            logger.warning("SQLite writes are serialized per worker only; %s workers will contend for the lock",
+                           workers)
+        # Set before the app is imported (in the master when preloading, else in each worker)
+        os.environ["DISPATCHER_ENABLED"] = "false"
+        _start_dispatcher()
+    try:
+        # Worker is None when gunicorn is not installed
+        if Worker is not None:
+            _run_gunicorn(workers)
+        else:
+            _run_uvicorn(workers)
+    finally:
+        _stop_dispatcher()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from services.db_writer import db_writer
+
+logger = logging.getLogger(__name__)
+
+# Buffered rows are inserted when this many are queued or after the interval
+BATCH_WRITER_MAX_ROWS = int(os.getenv("BATCH_WRITER_MAX_ROWS", "500"))
+BATCH_WRITER_FLUSH_INTERVAL = float(os.getenv("BATCH_WRITER_FLUSH_INTERVAL", "1.0"))
+
+_writers: List["BatchWriter"] = []
+
+
+def _bulk_insert(db: Session, model, rows: List[Dict[str, Any]]):
+    db.execute(insert(model), rows)
+
+
+class BatchWriter:
+    """Deferred, batched inserts for append-only rows such as history.
+
+    Request handlers ``add`` plain row dicts and return immediately; a
+    background task inserts everything buffered in one executemany per
+    batch through the database writer. Rows still buffered when the process
+    dies are lost, so only use this for data that can be regenerated.
+    """
+
+    def __init__(
+        self,
+        model,
+        max_rows: int = BATCH_WRITER_MAX_ROWS,
+        flush_interval: float = BATCH_WRITER_FLUSH_INTERVAL,
+    ):
+        self.model = model
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._rows: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        _writers.append(self)
+
+    @property
+    def pending(self) -> int:
+        return len(self._rows)
+
+    def start(self):
+        if self._task is not None and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name=f"batch-writer-{self.model.__tablename__}")
+
+    async def stop(self):
+        """Stop the background task and insert whatever is still buffered"""
+        task, self._task = self._task, None
+        if task is not None:
+            # Let the loop finish its current flush rather than cancelling it
+            # mid-write, which would lose the rows it had taken
+            self._stopping = True
+            self._wakeup.set()
+            await asyncio.gather(task, return_exceptions=True)
+        await self.flush()
+
+    def add(self, rows: List[Dict[str, Any]]):
+        """Queue rows for insertion; must be called from the event loop"""
+        self._rows.extend(rows)
+        self.start()
+        if len(self._rows) >= self.max_rows:
+            self._wakeup.set()
+
+    async def flush(self):
+        rows, self._rows = self._rows, []
+        for start in range(0, len(rows), self.max_rows):
+            chunk = rows[start:start + self.max_rows]
+            try:
+                await db_writer.run(_bulk_insert, self.model, chunk)
+                self.written += len(chunk)
+            except Exception as e:
+                self.dropped += len(chunk)
+                logger.error("Dropped %s %s rows: %s", len(chunk), self.model.__tablename__, e)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._rows:
+                await self.flush()
+
+
+async def stop_batch_writers():
+    """Flush every batch writer; called on application shutdown"""
+    for writer in _writers:
+        await writer.stop()
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from database import SQLITE_PRODUCTION, engine
+
+logger = logging.getLogger(__name__)
+
+# Funnel writes through one thread; defaults on in SQLite production mode
+DB_SINGLE_WRITER = os.getenv("DB_SINGLE_WRITER", str(SQLITE_PRODUCTION)).lower() == "true"
+
+# Objects returned from a write stay readable after the commit
+WriterSession = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+_STOP = object()
+
+
+class DBWriter:
+    """Serializes database writes through a single background thread.
+
+    SQLite allows one writer at a time; queueing writes in-process means
+    request handlers never contend for the write lock, and WAL lets readers
+    proceed concurrently. Each job ``fn(session, *args)`` runs in its own
+    session and is committed before its result is returned.
+    """
+
+    def __init__(self, session_factory: Callable = WriterSession, enabled: bool = DB_SINGLE_WRITER):
+        self.session_factory = session_factory
+        self.enabled = enabled
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _execute(self, fn: Callable[..., Any], args, kwargs) -> Any:
+        db = self.session_factory()
+        try:
+            result = fn(db, *args, **kwargs)
+            db.commit()
+            return result
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                break
+            future, fn, args, kwargs = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self._execute(fn, args, kwargs))
+            except Exception as e:
+                # Surfaced to the caller through the future
+                logger.debug("Queued database write failed: %s", e)
+                future.set_exception(e)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Drain queued writes and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Queue a write from any thread; returns a Future for its result"""
+        if not self.enabled:
+            future: Future = Future()
+            try:
+                future.set_result(self._execute(fn, args, kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        self.start()
+        future = Future()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await a write without blocking the event loop"""
+        if not self.enabled:
+            return await run_in_threadpool(self._execute, fn, args, kwargs)
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+
+db_writer = DBWriter()
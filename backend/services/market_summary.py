@@ -0,0 +1,164 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import MarketData, MarketPriceSummary, normalize_crop_key
+
+# Number of most recent price points kept per crop. Both the price and the
+# trend endpoints only ever look at the newest handful of points.
+SUMMARY_WINDOW = 10
+
+
+def compute_price_trend(prices: List[float]) -> str:
+    """Classify a newest-first price series as increasing, decreasing or stable"""
+    if len(prices) < 2:
+        return "stable"
+    recent_avg = sum(prices[:3]) / min(3, len(prices))
+    older_avg = sum(prices[3:6]) / min(3, len(prices[3:6])) if len(prices) > 3 else recent_avg
+    if recent_avg > older_avg * 1.05:
+        return "increasing"
+    if recent_avg < older_avg * 0.95:
+        return "decreasing"
+    return "stable"
+
+
+def _price_point(row: MarketData) -> Dict[str, Any]:
+    return {
+        'crop_name': row.crop_name,
+        'market_name': row.market_name,
+        'location': row.location,
+        'price_per_kg': row.price_per_kg,
+        'date': row.date.isoformat(),
+        'quality_grade': row.quality_grade,
+    }
+
+
+def _apply_window(summary: MarketPriceSummary, points: List[Dict[str, Any]]):
+    points = sorted(points, key=lambda p: p['date'], reverse=True)[:SUMMARY_WINDOW]
+    summary.recent_prices = points
+    if points:
+        summary.crop_name = points[0]['crop_name']
+        summary.latest_price = points[0]['price_per_kg']
+        summary.latest_date = datetime.fromisoformat(points[0]['date'])
+
+
+def _insert_missing_summary(db: Session, key: str, crop_name: str):
+    """Create an empty summary unless another transaction already has"""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(MarketPriceSummary.__table__).values(
+        crop_key=key, crop_name=crop_name, recent_prices=[], data_points=0,
+    )
+    db.execute(stmt.on_conflict_do_nothing(index_elements=['crop_key']))
+
+
+def _get_or_create_summary(db: Session, key: str, crop_name: str) -> MarketPriceSummary:
+    query = db.query(MarketPriceSummary).filter(MarketPriceSummary.crop_key == key)
+    if db.bind.dialect.name != "sqlite":
+        query = query.with_for_update()
+    summary = query.first()
+    if summary is None:
+        # FOR UPDATE cannot lock a row that does not exist yet; concurrent
+        # first writers for a crop race on the unique crop_key instead
+        _insert_missing_summary(db, key, crop_name)
+        summary = query.one()
+    return summary
+
+
+def record_market_prices(db: Session, rows: Iterable[MarketData]):
+    """Fold newly inserted MarketData rows into their crop summaries.
+
+    Must be called in the same transaction as the insert; the caller commits.
+    """
+    grouped: Dict[str, List[MarketData]] = {}
+    for row in rows:
+        grouped.setdefault(row.crop_key or normalize_crop_key(row.crop_name), []).append(row)
+
+    for key, crop_rows in grouped.items():
+        summary = _get_or_create_summary(db, key, crop_rows[0].crop_name)
+        points = list(summary.recent_prices or []) + [_price_point(r) for r in crop_rows]
+        _apply_window(summary, points)
+        summary.data_points = (summary.data_points or 0) + len(crop_rows)
+
+
+def refresh_price_summaries(db: Session, crop_keys: Optional[Iterable[str]] = None) -> int:
+    """Rebuild summaries from raw MarketData in one pass.
+
+    Refreshes every crop when ``crop_keys`` is None. Returns the number of
+    summaries written; the caller commits.
+    """
+    key_expr = MarketData.crop_key
+    ranked = db.query(
+        MarketData.id.label('id'),
+        key_expr.label('crop_key'),
+        func.row_number().over(partition_by=key_expr, order_by=MarketData.date.desc()).label('rank'),
+        func.count(MarketData.id).over(partition_by=key_expr).label('data_points'),
+    )
+    if crop_keys is not None:
+        crop_keys = list(crop_keys)
+        if not crop_keys:
+            return 0
+        ranked = ranked.filter(key_expr.in_(crop_keys))
+    ranked = ranked.subquery()
+
+    rows = db.query(MarketData, ranked.c.crop_key, ranked.c.data_points).join(
+        ranked, MarketData.id == ranked.c.id
+    ).filter(ranked.c.rank <= SUMMARY_WINDOW).all()
+
+    grouped: Dict[str, Dict[str, Any]] = {}
+    for row, key, data_points in rows:
+        entry = grouped.setdefault(key, {'points': [], 'data_points': data_points, 'crop_name': row.crop_name})
+        entry['points'].append(_price_point(row))
+
+    stale = db.query(MarketPriceSummary)
+    if crop_keys is not None:
+        stale = stale.filter(MarketPriceSummary.crop_key.in_(crop_keys))
+    stale.filter(~MarketPriceSummary.crop_key.in_(list(grouped.keys()))).delete(synchronize_session=False)
+
+    for key, entry in grouped.items():
+        summary = _get_or_create_summary(db, key, entry['crop_name'])
+        _apply_window(summary, entry['points'])
+        summary.data_points = entry['data_points']
+    return len(grouped)
+
+
+def get_recent_prices(db: Session, crop_name: str) -> List[Dict[str, Any]]:
+    """Return the newest price points for a crop, newest first.
+
+    Exact key matches are a single indexed lookup. Otherwise falls back to a
+    substring match over the (small) summary table, mirroring the old
+    ``ilike`` search over raw MarketData.
+    """
+    key = normalize_crop_key(crop_name)
+    summaries = db.query(MarketPriceSummary).filter(MarketPriceSummary.crop_key == key).all()
+    if not summaries:
+        summaries = db.query(MarketPriceSummary).filter(
+            MarketPriceSummary.crop_key.like(f"%{key}%")
+        ).all()
+    points: List[Dict[str, Any]] = []
+    for summary in summaries:
+        points.extend(summary.recent_prices or [])
+    return sorted(points, key=lambda p: p['date'], reverse=True)[:SUMMARY_WINDOW]
+
+
+def get_all_summaries(db: Session) -> List[MarketPriceSummary]:
+    """Return every crop summary, most recently priced first"""
+    return db.query(MarketPriceSummary).order_by(MarketPriceSummary.latest_date.desc()).all()
+
+
+def summarize_trends(summaries: Iterable[MarketPriceSummary]) -> List[Dict[str, Any]]:
+    """Current price and trend per crop from its summary"""
+    trends = []
+    for summary in summaries:
+        prices = [point['price_per_kg'] for point in summary.recent_prices or []]
+        trends.append({
+            'crop_name': summary.crop_name,
+            'current_price': round(prices[0], 2) if prices else 0,
+            'trend': compute_price_trend(prices),
+            'data_points': summary.data_points
+        })
+    return trends
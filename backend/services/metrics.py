@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import prometheus_client  # type: ignore
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram  # type: ignore
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily  # type: ignore
+except Exception:
+    prometheus_client = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true" and prometheus_client is not None
+# With several server workers, each writes its samples here and /metrics
+# aggregates them (prometheus_client multiprocess mode)
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+# How often the event loop lag probe wakes up
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5"))
+
+CONTENT_TYPE = prometheus_client.CONTENT_TYPE_LATEST if prometheus_client is not None else "text/plain"
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+_BATCH_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class _NoopMetric:
+    """Stand-in when prometheus_client is not installed or metrics are off"""
+
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def observe(self, value: float):
+        pass
+
+    def inc(self, value: float = 1):
+        pass
+
+    def dec(self, value: float = 1):
+        pass
+
+
+_NOOP = _NoopMetric()
+
+
+def _histogram(name: str, documentation: str, labels=(), buckets=_LATENCY_BUCKETS):
+    if not METRICS_ENABLED:
+        return _NOOP
+    return Histogram(name, documentation, labels, buckets=buckets)
+
+
+REQUEST_LATENCY = _histogram(
+    "http_request_duration_seconds", "Request latency by route template", ("method", "route", "status")
+)
+REQUESTS_IN_PROGRESS = (
+    Gauge("http_requests_in_progress", "Requests being handled", ("method",), multiprocess_mode="livesum")
+    if METRICS_ENABLED else _NOOP
+)
+MODEL_INFERENCE = _histogram(
+    "model_inference_seconds", "Time spent in model code by model and stage (transform, predict)",
+    ("model", "stage"), buckets=_FAST_BUCKETS
+)
+MODEL_BATCH_SIZE = _histogram(
+    "model_batch_size", "Rows per model call", ("model",), buckets=_BATCH_BUCKETS
+)
+DB_QUERY = _histogram(
+    "db_query_seconds", "Database statement execution time", ("engine", "operation"), buckets=_FAST_BUCKETS
+)
+EXTERNAL_CALL = _histogram(
+    "external_call_seconds", "Calls to external services (SMS, weather)", ("service", "outcome")
+)
+EVENT_LOOP_LAG = _histogram(
+    "event_loop_lag_seconds", "Delay of a periodic timer on the event loop", buckets=_FAST_BUCKETS
+)
+ERRORS = (
+    Counter("http_request_exceptions_total", "Unhandled exceptions by route template", ("route",))
+    if METRICS_ENABLED else _NOOP
+)
+
+
+@contextmanager
+def track_model(model: str, stage: str, batch_size: Optional[int] = None):
+    """Time a block of model code; ``batch_size`` also records rows per call"""
+    if batch_size is not None:
+        MODEL_BATCH_SIZE.labels(model=model).observe(batch_size)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        MODEL_INFERENCE.labels(model=model, stage=stage).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def track_call(service: str):
+    """Time a call to an external service, labelled ok or error"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        EXTERNAL_CALL.labels(service=service, outcome=outcome).observe(time.perf_counter() - started)
+
+
+def _route_template(scope: Scope) -> str:
+    route = scope.get("route")
+    # Unmatched paths share one label so scanners can't blow up cardinality
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Per-route latency histogram, labelled by route template and status"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.labels(method=method).inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception:
+            ERRORS.labels(route=_route_template(scope)).inc()
+            raise
+        finally:
+            REQUESTS_IN_PROGRESS.labels(method=method).dec()
+            REQUEST_LATENCY.labels(method=method, route=_route_template(scope), status=str(status)).observe(
+                time.perf_counter() - started
+            )
+
+
+def instrument_engine(engine: Any, name: str):
+    """Record statement timings for a (sync) SQLAlchemy engine"""
+    if not METRICS_ENABLED:
+        return
+    from sqlalchemy import event
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_QUERY.labels(engine=name, operation=operation).observe(time.perf_counter() - started)
+
+    def handle_error(context):
+        # Keep the start-time stack balanced when a statement fails
+        stack = context.connection.info.get("query_started") if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+
+class _RuntimeCollector:
+    """Pool and cache state, read at scrape time (per process)"""
+
+    def collect(self):
+        from database import pool_status
+        from services.cache import all_caches
+
+        pool = GaugeMetricFamily("db_pool_connections", "Connection pool state", labels=("engine", "state"))
+        for engine_name, stats in pool_status().items():
+            for state in ("size", "checked_out", "overflow", "checked_in"):
+                if state in stats:
+                    pool.add_metric((engine_name, state), stats[state])
+        yield pool
+
+        hits = CounterMetricFamily("cache_hits", "In-process cache hits", labels=("cache",))
+        misses = CounterMetricFamily("cache_misses", "In-process cache misses", labels=("cache",))
+        ratio = GaugeMetricFamily("cache_hit_ratio", "Cache hit ratio since start", labels=("cache",))
+        entries = GaugeMetricFamily("cache_entries", "Entries currently cached", labels=("cache",))
+        for cache in all_caches():
+            lookups = cache.hits + cache.misses
+            hits.add_metric((cache.name,), cache.hits)
+            misses.add_metric((cache.name,), cache.misses)
+            ratio.add_metric((cache.name,), cache.hits / lookups if lookups else 0.0)
+            entries.add_metric((cache.name,), len(cache))
+        yield from (hits, misses, ratio, entries)
+
+
+if METRICS_ENABLED:
+    _runtime_collector = _RuntimeCollector()
+    prometheus_client.REGISTRY.register(_runtime_collector)
+
+
+def render_metrics() -> bytes:
+    """Exposition text for /metrics"""
+    if not METRICS_ENABLED:
+        return b""
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        # Pool and cache state are not shared between workers; this worker's only
+        registry.register(_runtime_collector)
+        return prometheus_client.generate_latest(registry)
+    return prometheus_client.generate_latest()
+
+
+async def monitor_event_loop(interval: float = EVENT_LOOP_LAG_INTERVAL):
+    """Record how late a periodic timer fires; lag means something blocked the loop"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - started - interval))
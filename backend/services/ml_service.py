@@ -8,9 +8,12 @@ try:
 except Exception:
     pd = None  # type: ignore
 import os
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import List, Dict, Any, Tuple
 import json
 
+from services.metrics import track_model
+
 # Optional heavy dependencies
 try:
     from sklearn.preprocessing import StandardScaler  # type: ignore
@@ -28,7 +31,7 @@ except Exception:
     tf = None  # type: ignore
 
 class MLService:
-    def __init__(self):
+    def __init__(self, models_path: str = "models/"):
         self.crop_model = None
         self.yield_model = None
         self.fertilizer_model = None
@@ -39,7 +42,7 @@ class MLService:
         self.disease_model = None
         self.pest_model = None
         self.faq_model_dir = None
-        self.models_path = "models/"
+        self.models_path = models_path
         os.makedirs(self.models_path, exist_ok=True)
         self._load_or_train_models()
     
@@ -100,6 +103,30 @@ class MLService:
         else:
             self.faq_model_dir = None
     
+    # Loaded model attribute -> file it was loaded from
+    MODEL_FILES = {
+        'crop_model': 'crop_model.pkl',
+        'yield_model': 'yield_model.pkl',
+        'fertilizer_model': 'fertilizer_model.pkl',
+        'price_model': 'price_model.pkl',
+        'disease_model': 'disease_model.h5',
+        'pest_model': 'pest_model.h5',
+    }
+
+    def model_versions(self) -> Dict[str, str]:
+        """Modification time of each loaded model's file, used as its version"""
+        versions = {}
+        for attribute, filename in self.MODEL_FILES.items():
+            if getattr(self, attribute) is None:
+                continue
+            try:
+                mtime = os.path.getmtime(os.path.join(self.models_path, filename))
+            except OSError:
+                versions[attribute] = 'in-memory'
+                continue
+            versions[attribute] = datetime.fromtimestamp(mtime).strftime('%Y%m%dT%H%M%S')
+        return versions
+    
     def _create_sample_data(self):
         """Create sample training data for demonstration"""
         if np is None or pd is None:
@@ -176,15 +203,15 @@ class MLService:
     def get_crop_recommendations(self, soil_data: Dict[str, Any], weather_data: Dict[str, Any], 
                                 season: str, state: str) -> List[Dict[str, Any]]:
         """Get crop recommendations based on soil and weather data"""
-        if self.crop_model is None or self.yield_model is None or self.scaler is None or np is None:
-            raise RuntimeError("Crop/yield models or scaler not available on this setup")
+        return self.get_crop_recommendations_batch([(soil_data, weather_data, season, state)])[0]
+    
+    def _feature_row(self, soil_data: Dict[str, Any], weather_data: Dict[str, Any],
+                     season: str, state: str) -> List[float]:
         # Encode season and state
         season_encoding = {'kharif': 0, 'rabi': 1, 'summer': 2}.get(season.lower(), 0)
         state_encoding = {'andhra_pradesh': 0, 'telangana': 1, 'karnataka': 2, 
                          'tamil_nadu': 3, 'kerala': 4}.get(state.lower().replace(' ', '_'), 0)
-        
-        # Prepare input features
-        features = np.array([[
+        return [
             soil_data.get('ph', 6.5),
             soil_data.get('nitrogen', 50),
             soil_data.get('phosphorus', 30),
@@ -195,65 +222,96 @@ class MLService:
             weather_data.get('humidity', 70),
             season_encoding,
             state_encoding
-        ]])
+        ]
+    
+    def get_crop_recommendations_batch(self, inputs: List[Tuple[Dict[str, Any], Dict[str, Any], str, str]]
+                                       ) -> List[List[Dict[str, Any]]]:
+        """Recommendations for many (soil_data, weather_data, season, state) inputs.
+
+        Scaling and every model run once over the whole feature matrix
+        instead of once per input.
+        """
+        if self.crop_model is None or self.yield_model is None or self.scaler is None or np is None:
+            raise RuntimeError("Crop/yield models or scaler not available on this setup")
+        if not inputs:
+            return []
+        
+        # Prepare input features
+        features = np.array([self._feature_row(*item) for item in inputs], dtype=float)
         
         # Scale features
-        features_scaled = self.scaler.transform(features)
+        with track_model('crop', 'transform', batch_size=len(features)):
+            features_scaled = self.scaler.transform(features)
         
         # Get predictions
-        crop_prediction = self.crop_model.predict(features_scaled)[0]
-        yield_prediction = self.yield_model.predict(features_scaled)[0]
+        with track_model('crop', 'predict'):
+            crop_predictions = self.crop_model.predict(features_scaled)
+        with track_model('yield', 'predict', batch_size=len(features)):
+            yield_predictions = self.yield_model.predict(features_scaled)
         
         # Calculate confidence score (simplified)
-        confidence_score = min(0.95, max(0.6, np.random.random()))
+        confidence_scores = np.clip(np.random.random(len(inputs)), 0.6, 0.95)
+        
+        # Optional fertilizer suggestion via separate model
+        fert_predictions = None
+        try:
+            if self.fertilizer_model is not None and self.fertilizer_scaler is not None:
+                with track_model('fertilizer', 'transform', batch_size=len(features)):
+                    fert_features = self.fertilizer_scaler.transform(features[:, :5])
+                with track_model('fertilizer', 'predict'):
+                    fert_predictions = self.fertilizer_model.predict(fert_features)
+        except Exception:
+            fert_predictions = None
         
         # Calculate expected profit (simplified)
         crop_prices = {
             'Rice': 25, 'Wheat': 20, 'Maize': 18, 'Sugarcane': 3, 
             'Cotton': 60, 'Millets': 15
         }
-        price_per_kg = crop_prices.get(crop_prediction, 20)
-        expected_profit = yield_prediction * price_per_kg * 0.3  # 30% profit margin
         
-        # Calculate sustainability score
-        sustainability_score = min(0.95, max(0.5, 
-            (soil_data.get('organic_matter', 2.5) / 5.0) * 0.4 + 
-            (1 - abs(soil_data.get('ph', 6.5) - 6.8) / 6.8) * 0.3 +
-            (weather_data.get('rainfall', 1000) / 1500) * 0.3
-        ))
-        
-        result = [{
-            'crop_name': crop_prediction,
-            'confidence_score': round(confidence_score, 2),
-            'expected_yield': round(max(0, yield_prediction), 2),
-            'expected_profit': round(expected_profit, 2),
-            'sustainability_score': round(sustainability_score, 2),
-        }]
-        # Optional fertilizer suggestion via separate model
-        try:
-            if self.fertilizer_model is not None and self.fertilizer_scaler is not None:
-                fert_features = self.fertilizer_scaler.transform(features[:, :5])
-                fert_pred = self.fertilizer_model.predict(fert_features)[0]
+        results = []
+        for i, (soil_data, weather_data, _, _) in enumerate(inputs):
+            crop_prediction = crop_predictions[i]
+            yield_prediction = float(yield_predictions[i])
+            price_per_kg = crop_prices.get(crop_prediction, 20)
+            expected_profit = yield_prediction * price_per_kg * 0.3  # 30% profit margin
+            
+            # Calculate sustainability score
+            sustainability_score = min(0.95, max(0.5, 
+                (soil_data.get('organic_matter', 2.5) / 5.0) * 0.4 + 
+                (1 - abs(soil_data.get('ph', 6.5) - 6.8) / 6.8) * 0.3 +
+                (weather_data.get('rainfall', 1000) / 1500) * 0.3
+            ))
+            
+            result = [{
+                'crop_name': str(crop_prediction),
+                'confidence_score': round(float(confidence_scores[i]), 2),
+                'expected_yield': round(max(0, yield_prediction), 2),
+                'expected_profit': round(expected_profit, 2),
+                'sustainability_score': round(sustainability_score, 2),
+            }]
+            if fert_predictions is not None:
                 result[0]['fertilizer_recommendation'] = {
-                    'type': str(fert_pred),
+                    'type': str(fert_predictions[i]),
                     'quantity_per_acre': '50-75 kg',
                     'application_method': 'Broadcast and mix with soil'
                 }
-        except Exception:
-            pass
-        return result
+            results.append(result)
+        return results
     
     def detect_pest_disease(self, image_path: str, detection_type: str) -> Dict[str, Any]:
         """Detect pest or disease from image (simplified implementation)"""
         # If CNN models are available, use them; otherwise fallback to heuristic
         if tf is not None and np is not None:
             try:
-                img = tf.keras.preprocessing.image.load_img(image_path, target_size=(224,224))
-                arr = tf.keras.preprocessing.image.img_to_array(img)
-                arr = np.expand_dims(arr, axis=0)
-                arr = arr / 255.0
+                with track_model(detection_type, 'preprocess'):
+                    img = tf.keras.preprocessing.image.load_img(image_path, target_size=(224,224))
+                    arr = tf.keras.preprocessing.image.img_to_array(img)
+                    arr = np.expand_dims(arr, axis=0)
+                    arr = arr / 255.0
                 if detection_type == 'disease' and self.disease_model is not None:
-                    preds = self.disease_model.predict(arr, verbose=0)[0]
+                    with track_model('disease', 'predict', batch_size=1):
+                        preds = self.disease_model.predict(arr, verbose=0)[0]
                     idx = int(np.argmax(preds))
                     conf = float(np.max(preds))
                     name = f"class_{idx}"
@@ -265,7 +323,8 @@ class MLService:
                         'severity': 'medium'
                     }
                 if detection_type == 'pest' and self.pest_model is not None:
-                    preds = self.pest_model.predict(arr, verbose=0)[0]
+                    with track_model('pest', 'predict', batch_size=1):
+                        preds = self.pest_model.predict(arr, verbose=0)[0]
                     idx = int(np.argmax(preds))
                     conf = float(np.max(preds))
                     name = f"class_{idx}"
@@ -318,3 +377,15 @@ class MLService:
                 'severity': severity
             }
 
+
+
+_ml_service = None
+
+
+def get_ml_service() -> MLService:
+    """Process-wide MLService, so models are loaded once per worker (or once
+    before fork when the server preloads the app)"""
+    global _ml_service
+    if _ml_service is None:
+        _ml_service = MLService()
+    return _ml_service
@@ -0,0 +1,56 @@
+import hashlib
+import os
+import re
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from models import Notification
+
+# Identical alerts to the same farmer within this window are collapsed
+# into the first one (0 disables deduplication)
+NOTIFICATION_DEDUPE_WINDOW_SECONDS = int(os.getenv("NOTIFICATION_DEDUPE_WINDOW_SECONDS", "3600"))
+# Non-urgent alerts wait this long so alerts arriving together go out as
+# one digest SMS; high priority alerts are due immediately
+NOTIFICATION_DIGEST_DELAY_SECONDS = int(os.getenv("NOTIFICATION_DIGEST_DELAY_SECONDS", "30"))
+# Alerts merged into a single digest message
+NOTIFICATION_DIGEST_MAX_ITEMS = int(os.getenv("NOTIFICATION_DIGEST_MAX_ITEMS", "5"))
+
+
+def dedupe_key(notification_type: str, message: str) -> str:
+    """Stable key for an alert; case and whitespace differences are ignored"""
+    normalized = re.sub(r"\s+", " ", message.strip().lower())
+    return hashlib.sha1(f"{notification_type.lower()}|{normalized}".encode()).hexdigest()
+
+
+def first_attempt_at(priority: str, now: datetime) -> datetime:
+    if priority == "high":
+        return now
+    return now + timedelta(seconds=NOTIFICATION_DIGEST_DELAY_SECONDS)
+
+
+def find_duplicate(db: Session, farmer_id: int, key: str, now: datetime) -> Optional[Notification]:
+    """The farmer's alert with the same key whose coalescing window is still open"""
+    if NOTIFICATION_DEDUPE_WINDOW_SECONDS <= 0:
+        return None
+    return db.query(Notification).filter(
+        Notification.farmer_id == farmer_id,
+        Notification.dedupe_key == key,
+        Notification.coalesce_until > now
+    ).order_by(Notification.id.desc()).first()
+
+
+def coalesce_until(now: datetime) -> Optional[datetime]:
+    if NOTIFICATION_DEDUPE_WINDOW_SECONDS <= 0:
+        return None
+    return now + timedelta(seconds=NOTIFICATION_DEDUPE_WINDOW_SECONDS)
+
+
+def build_digest(messages: List[str]) -> str:
+    """Merge pending alerts for one farmer into a single SMS body"""
+    if len(messages) == 1:
+        return messages[0]
+    lines = [f"{len(messages)} new alerts:"]
+    lines.extend(f"{i}. {message}" for i, message in enumerate(messages, 1))
+    return "\n".join(lines)
@@ -0,0 +1,298 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import Session
+
+from models import Farmer, Notification
+from services.db_writer import db_writer
+from services.metrics import track_call
+from services.notification_coalescing import NOTIFICATION_DIGEST_MAX_ITEMS, build_digest
+from services.sms import SMSProvider, get_sms_provider
+
+logger = logging.getLogger(__name__)
+
+# Run the outbox poller in this process. It must run in exactly one process
+# (each has its own rate limiter); serve.py turns it off in its workers and
+# runs jobs/dispatch_notifications.py instead
+DISPATCHER_ENABLED = os.getenv("DISPATCHER_ENABLED", "true").lower() == "true"
+# Concurrent SMS sends per process and the provider rate limit (0 = unlimited)
+NOTIFICATION_WORKERS = int(os.getenv("NOTIFICATION_WORKERS", "16"))
+SMS_RATE_PER_SECOND = float(os.getenv("SMS_RATE_PER_SECOND", "10"))
+# Rows claimed per poll, and how often the outbox is polled when idle
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "250"))
+NOTIFICATION_POLL_INTERVAL = float(os.getenv("NOTIFICATION_POLL_INTERVAL", "2"))
+# Claimed rows become due again after the lease if the process dies mid-send
+NOTIFICATION_LEASE_SECONDS = int(os.getenv("NOTIFICATION_LEASE_SECONDS", "300"))
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "5"))
+NOTIFICATION_RETRY_BASE_SECONDS = float(os.getenv("NOTIFICATION_RETRY_BASE_SECONDS", "30"))
+NOTIFICATION_RETRY_MAX_SECONDS = float(os.getenv("NOTIFICATION_RETRY_MAX_SECONDS", "3600"))
+
+
+class TokenBucket:
+    """Async token bucket; ``acquire`` waits until a send is allowed."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with full jitter"""
+    ceiling = min(NOTIFICATION_RETRY_MAX_SECONDS, NOTIFICATION_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def claim_due_notifications(db: Session, limit: int, lease_seconds: int) -> List[Dict[str, Any]]:
+    """Atomically lease up to ``limit`` due notifications.
+
+    The claim is a single UPDATE over a LIMITed subquery, so concurrent
+    dispatchers (other workers or processes) never pick up the same row;
+    on PostgreSQL locked rows are skipped rather than waited on. Alerts
+    still waiting out their digest delay for the same farmers are claimed
+    along with them so they can share one SMS.
+    """
+    now = datetime.now()
+    lease_until = now + timedelta(seconds=lease_seconds)
+    returning = (Notification.id, Notification.farmer_id, Notification.message, Notification.attempts)
+    due = (
+        select(Notification.id)
+        .where(
+            Notification.is_sent == False,
+            Notification.next_attempt_at.isnot(None),
+            Notification.next_attempt_at <= now,
+        )
+        .order_by(Notification.next_attempt_at)
+        .limit(limit)
+    )
+    if db.bind.dialect.name == "postgresql":
+        due = due.with_for_update(skip_locked=True)
+    claimed = db.execute(
+        update(Notification)
+        .where(Notification.id.in_(due.scalar_subquery()))
+        .values(attempts=Notification.attempts + 1, next_attempt_at=lease_until)
+        .returning(*returning)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not claimed:
+        return []
+
+    farmer_ids = {row.farmer_id for row in claimed}
+    # Never-attempted rows scheduled later; leased and retrying rows have attempts > 0
+    claimed += db.execute(
+        update(Notification)
+        .where(
+            Notification.farmer_id.in_(farmer_ids),
+            Notification.is_sent == False,
+            Notification.attempts == 0,
+            Notification.next_attempt_at > now,
+        )
+        .values(attempts=Notification.attempts + 1, next_attempt_at=lease_until)
+        .returning(*returning)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    phones = dict(db.query(Farmer.id, Farmer.phone).filter(Farmer.id.in_(farmer_ids)).all())
+    return [
+        {
+            'id': row.id,
+            'farmer_id': row.farmer_id,
+            'phone': phones.get(row.farmer_id),
+            'message': row.message,
+            'attempts': row.attempts,
+        }
+        for row in claimed
+    ]
+
+
+def group_digests(batch: List[Dict[str, Any]], max_items: int = NOTIFICATION_DIGEST_MAX_ITEMS) -> List[List[Dict[str, Any]]]:
+    """Split a claimed batch into per-farmer groups of at most ``max_items``"""
+    by_farmer: Dict[int, List[Dict[str, Any]]] = {}
+    for item in sorted(batch, key=lambda item: item['id']):
+        by_farmer.setdefault(item['farmer_id'], []).append(item)
+    size = max(1, max_items)
+    return [items[i:i + size] for items in by_farmer.values() for i in range(0, len(items), size)]
+
+
+def record_results(db: Session, results: List[Dict[str, Any]]):
+    """Write a batch of send outcomes back to the outbox"""
+    db.execute(update(Notification), results)
+
+
+def outbox_stats(db: Session) -> Dict[str, Any]:
+    """Outbox state across all processes, read from the database"""
+    now = datetime.now()
+    queued = (Notification.is_sent == False) & Notification.next_attempt_at.isnot(None)
+    queued_count, due, retrying, failed, sent_last_hour = db.query(
+        func.count(case((queued, 1))),
+        func.count(case((queued & (Notification.next_attempt_at <= now), 1))),
+        func.count(case((queued & (Notification.attempts > 0), 1))),
+        func.count(case((
+            (Notification.is_sent == False) & Notification.next_attempt_at.is_(None) & (Notification.attempts > 0), 1
+        ))),
+        func.count(case(((Notification.is_sent == True) & (Notification.sent_at > now - timedelta(hours=1)), 1))),
+    ).one()
+    return {
+        'queued': queued_count,
+        'due': due,
+        'retrying': retrying,
+        'failed': failed,
+        'sent_last_hour': sent_last_hour,
+    }
+
+
+class NotificationDispatcher:
+    """Drains the notification outbox with a bounded pool of async senders.
+
+    Requests only insert a ``Notification`` row with ``next_attempt_at`` set;
+    a poller leases due rows in batches, sends them through the configured
+    SMS provider under a concurrency limit and rate limit, and records the
+    outcome of each batch in one write. A farmer's pending
+    alerts in a batch are merged into one digest SMS. Failed sends are
+    retried with exponential backoff until NOTIFICATION_MAX_ATTEMPTS is
+    reached.
+    """
+
+    def __init__(
+        self,
+        provider: Optional[SMSProvider] = None,
+        workers: int = NOTIFICATION_WORKERS,
+        rate_per_second: float = SMS_RATE_PER_SECOND,
+        batch_size: int = NOTIFICATION_BATCH_SIZE,
+        poll_interval: float = NOTIFICATION_POLL_INTERVAL,
+    ):
+        self.provider = provider
+        self.workers = workers
+        self.rate_per_second = rate_per_second
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.sent = 0
+        self.failed = 0
+        # Alerts delivered inside another alert's digest instead of their own SMS
+        self.coalesced = 0
+        self.started_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.provider is not None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.enabled or self.running:
+            return
+        self._limiter = TokenBucket(self.rate_per_second)
+        self._semaphore = asyncio.Semaphore(self.workers)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="notification-dispatcher")
+        self.started_at = time.monotonic()
+        logger.info("Notification dispatcher started with %s provider", self.provider.name)
+
+    async def stop(self):
+        """Stop polling; leased rows in flight are retried after their lease"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def wake(self):
+        """Poll immediately instead of waiting for the next interval"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Delivery counters for this process since start"""
+        uptime = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            'provider': self.provider.name if self.provider else None,
+            'running': self.running,
+            'workers': self.workers,
+            'rate_limit_per_second': self.rate_per_second,
+            'sent': self.sent,
+            'failed': self.failed,
+            'coalesced': self.coalesced,
+            'sent_per_second': round(self.sent / uptime, 2) if uptime else 0.0,
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                claimed = await self.dispatch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Notification dispatch failed: %s", e)
+                claimed = 0
+            # A full batch means more rows are likely due; keep draining
+            if claimed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def dispatch_once(self) -> int:
+        """Claim, send and record one batch; returns the number of rows claimed"""
+        batch = await db_writer.run(claim_due_notifications, self.batch_size, NOTIFICATION_LEASE_SECONDS)
+        if batch:
+            groups = await asyncio.gather(*(self._deliver(group) for group in group_digests(batch)))
+            await db_writer.run(record_results, [result for group in groups for result in group])
+        return len(batch)
+
+    async def _deliver(self, group: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send one (digest) SMS and return the outcome for every alert in it"""
+        ids = [item['id'] for item in group]
+        phone = group[0]['phone']
+        if not phone:
+            error = "Farmer has no phone number"
+            return [{'id': notification_id, 'next_attempt_at': None, 'last_error': error} for notification_id in ids]
+        try:
+            async with self._semaphore:
+                await self._limiter.acquire()
+                with track_call(f"sms_{self.provider.name}"):
+                    await self.provider.send(phone, build_digest([item['message'] for item in group]))
+        except Exception as e:
+            self.failed += 1
+            error = str(e)[:500]
+            attempts = max(item['attempts'] for item in group)
+            if attempts >= NOTIFICATION_MAX_ATTEMPTS:
+                logger.warning("Giving up on notifications %s after %s attempts: %s", ids, attempts, error)
+                return [{'id': notification_id, 'next_attempt_at': None, 'last_error': error} for notification_id in ids]
+            retry_at = datetime.now() + timedelta(seconds=retry_delay(attempts))
+            return [{'id': notification_id, 'next_attempt_at': retry_at, 'last_error': error} for notification_id in ids]
+        self.sent += 1
+        self.coalesced += len(group) - 1
+        sent_at = datetime.now()
+        return [
+            {'id': notification_id, 'is_sent': True, 'sent_at': sent_at, 'next_attempt_at': None, 'last_error': None}
+            for notification_id in ids
+        ]
+
+
+notification_dispatcher = NotificationDispatcher(provider=get_sms_provider())
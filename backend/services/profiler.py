@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Sample stacks continuously and keep profiles of requests slower than
+# PROFILE_SLOW_REQUEST_MS; admins can also ask for one with X-Profile: 1
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_SLOW_REQUEST_MS = float(os.getenv("PROFILE_SLOW_REQUEST_MS", "2000"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "10"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Oldest profiles are deleted beyond this many
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+# Seconds of samples kept in memory; requests longer than this are truncated
+PROFILE_BUFFER_SECONDS = float(os.getenv("PROFILE_BUFFER_SECONDS", "60"))
+
+PROFILE_HEADER = "x-profile"
+
+# Leaf frames of threads that are only waiting (event loop select, idle pool workers)
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _fold(frame) -> Optional[str]:
+    """Root-first ``a;b;c`` stack, or None when the thread is idle"""
+    if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_LEAVES:
+        return None
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Samples every thread's Python stack on a background thread.
+
+    Samples go into a time-ordered ring buffer; ``samples_between`` returns
+    the folded stacks seen during a request. They are process-wide, so a
+    profile also shows whatever concurrent requests were doing.
+    """
+
+    def __init__(self, interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS, buffer_seconds: float = PROFILE_BUFFER_SECONDS):
+        self.interval = interval_ms / 1000.0
+        self._samples: Deque[Tuple[float, str, str]] = deque(maxlen=max(1, int(buffer_seconds / self.interval)))
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if not self.running:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(1.0)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = _fold(frame)
+                if stack is not None:
+                    self._samples.append((now, names.get(thread_id, str(thread_id)), stack))
+
+    def samples_between(self, started: float, finished: float) -> Counter:
+        """Folded stacks (prefixed with the thread name) sampled in a time window"""
+        counts: Counter = Counter()
+        for timestamp, thread_name, stack in list(self._samples):
+            if started <= timestamp <= finished:
+                counts[f"{thread_name};{stack}"] += 1
+        return counts
+
+
+sampler = StackSampler()
+
+
+def _model_versions() -> Dict[str, str]:
+    from services.ml_service import get_ml_service
+
+    try:
+        return get_ml_service().model_versions()
+    except Exception:
+        return {}
+
+
+def _prune(directory: str, keep: int):
+    profiles = sorted(name for name in os.listdir(directory) if name.endswith(".folded"))
+    for name in profiles[:max(0, len(profiles) - keep)]:
+        for path in (name, name[:-len(".folded")] + ".json"):
+            try:
+                os.remove(os.path.join(directory, path))
+            except OSError:
+                pass
+
+
+def write_profile(profile_id: str, counts: Counter, metadata: Dict[str, Any]) -> str:
+    """Write ``<id>.folded`` (flamegraph.pl / speedscope input) and ``<id>.json``"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.folded")
+    with open(path, "w") as f:
+        for stack, count in counts.most_common():
+            f.write(f"{stack} {count}\n")
+    metadata = dict(metadata, samples=sum(counts.values()), sample_interval_ms=PROFILE_SAMPLE_INTERVAL_MS,
+                    model_versions=_model_versions(), pid=os.getpid())
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.json"), "w") as f:
+        json.dump(metadata, f, indent=2)
+    _prune(PROFILE_DIR, PROFILE_MAX_FILES)
+    return path
+
+
+def _route_template(scope: Scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope.get("path", "")
+
+
+class ProfilingMiddleware:
+    """Keeps stack profiles of slow requests, and of admin requests sent
+    with ``X-Profile: 1`` (the response then names it in ``X-Profile-Id``).
+    """
+
+    def __init__(self, app: ASGIApp, enabled: bool = PROFILING_ENABLED, slow_ms: float = PROFILE_SLOW_REQUEST_MS) -> None:
+        self.app = app
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+
+    def _requested(self, scope: Scope) -> bool:
+        from auth import is_admin_key
+
+        headers = Headers(scope=scope)
+        return headers.get(PROFILE_HEADER) == "1" and is_admin_key(headers.get("x-admin-key"))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = self._requested(scope)
+        if not (self.enabled or requested):
+            await self.app(scope, receive, send)
+            return
+
+        sampler.start()
+        started = time.perf_counter()
+        wall_started = datetime.now()
+        profile_id = None
+        status = 500
+        if requested:
+            profile_id = f"{wall_started:%Y%m%dT%H%M%S}-{os.getpid()}-requested-{uuid.uuid4().hex[:6]}"
+
+        async def send_with_profile_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile_id is not None:
+                    MutableHeaders(scope=message)["X-Profile-Id"] = profile_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            finished = time.perf_counter()
+            duration_ms = (finished - started) * 1000
+            if profile_id is None and duration_ms >= self.slow_ms:
+                route = re.sub(r"[^A-Za-z0-9]+", "_", _route_template(scope)).strip("_") or "root"
+                profile_id = f"{wall_started:%Y%m%dT%H%M%S}-{os.getpid()}-{route}-{int(duration_ms)}ms"
+            if profile_id is not None:
+                metadata = {
+                    "id": profile_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": _route_template(scope),
+                    "status": status,
+                    "duration_ms": round(duration_ms, 1),
+                    "started_at": wall_started.isoformat(),
+                    "trigger": "header" if requested else "slow",
+                }
+                counts = sampler.samples_between(started, finished)
+                try:
+                    # Off the event loop; a slow request should not make the next one slower
+                    path = await asyncio.to_thread(write_profile, profile_id, counts, metadata)
+                    logger.info("Profile of %s %s (%.0f ms) written to %s",
+                                scope["method"], scope["path"], duration_ms, path)
+                except OSError as e:
+                    logger.warning("Could not write profile %s: %s", profile_id, e)
@@ -0,0 +1,61 @@
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from models import Farmer, RecommendationSnapshot, normalize_region_key
+
+SEASONS = ('kharif', 'rabi', 'summer')
+
+# Snapshots older than this are ignored and recommendations are computed live
+RECOMMENDATION_SNAPSHOT_MAX_AGE_HOURS = float(os.getenv("RECOMMENDATION_SNAPSHOT_MAX_AGE_HOURS", "48"))
+
+
+def snapshot_key(state: str, district: str, season: str) -> Tuple[str, str, str]:
+    return normalize_region_key(state), normalize_region_key(district), normalize_region_key(season)
+
+
+def get_snapshot(db: Session, state: str, district: str, season: str) -> Optional[List[Dict[str, Any]]]:
+    """Fresh precomputed recommendations for a district and season, if any"""
+    state_key, district_key, season_key = snapshot_key(state, district, season)
+    cutoff = datetime.now() - timedelta(hours=RECOMMENDATION_SNAPSHOT_MAX_AGE_HOURS)
+    row = db.query(RecommendationSnapshot.recommendations).filter(
+        RecommendationSnapshot.state_key == state_key,
+        RecommendationSnapshot.district_key == district_key,
+        RecommendationSnapshot.season == season_key,
+        RecommendationSnapshot.computed_at >= cutoff
+    ).first()
+    return row.recommendations if row else None
+
+
+def farmer_regions(db: Session) -> List[Tuple[str, str]]:
+    """Distinct (state, district) pairs of active farmers, one spelling per region"""
+    regions: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    for state, district in db.query(Farmer.state, Farmer.district).filter(Farmer.is_active == True).distinct():
+        key = (normalize_region_key(state), normalize_region_key(district))
+        regions.setdefault(key, (state, district))
+    return sorted(regions.values())
+
+
+def store_snapshots(db: Session, snapshots: Iterable[Dict[str, Any]]) -> int:
+    """Insert or replace snapshots given as dicts with state, district, season,
+    recommendations and inputs"""
+    now = datetime.now()
+    existing = {
+        (row.state_key, row.district_key, row.season): row
+        for row in db.query(RecommendationSnapshot).all()
+    }
+    count = 0
+    for snapshot in snapshots:
+        key = snapshot_key(snapshot['state'], snapshot['district'], snapshot['season'])
+        row = existing.get(key)
+        if row is None:
+            row = RecommendationSnapshot(state_key=key[0], district_key=key[1], season=key[2])
+            db.add(row)
+            existing[key] = row
+        row.recommendations = snapshot['recommendations']
+        row.inputs = snapshot.get('inputs')
+        row.computed_at = now
+        count += 1
+    return count
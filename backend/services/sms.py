@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import os
+import random
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# twilio, local (in-process stand-in) or none; defaults to twilio when
+# credentials are configured
+SMS_PROVIDER = os.getenv("SMS_PROVIDER")
+
+TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
+
+
+class SMSError(Exception):
+    """Raised when a provider fails to accept a message."""
+    pass
+
+
+class SMSProvider(ABC):
+    name = "base"
+
+    @abstractmethod
+    async def send(self, to: str, body: str) -> str:
+        """Send one message and return the provider's message id"""
+
+
+class TwilioSMSProvider(SMSProvider):
+    name = "twilio"
+
+    def __init__(self, account_sid: str, auth_token: str, from_number: str):
+        from twilio.rest import Client
+
+        self.client = Client(account_sid, auth_token)
+        self.from_number = from_number
+
+    async def send(self, to: str, body: str) -> str:
+        try:
+            # The Twilio SDK is blocking
+            message = await asyncio.to_thread(
+                self.client.messages.create, body=body, from_=self.from_number, to=to
+            )
+        except Exception as e:
+            raise SMSError(str(e)) from e
+        return message.sid
+
+
+class LocalSMSProvider(SMSProvider):
+    """In-process stand-in for development and load tests.
+
+    Simulates provider latency and a failure rate, and keeps the most
+    recent messages in ``sent`` for inspection.
+    """
+
+    name = "local"
+
+    def __init__(self, latency_ms: float = 50.0, failure_rate: float = 0.0, keep: int = 1000):
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self.sent = deque(maxlen=keep)
+
+    async def send(self, to: str, body: str) -> str:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000.0)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise SMSError("Simulated provider failure")
+        sid = f"local-{uuid.uuid4().hex[:12]}"
+        self.sent.append({'sid': sid, 'to': to, 'body': body})
+        logger.debug("Local SMS to %s: %s", to, body)
+        return sid
+
+
+def get_sms_provider() -> Optional[SMSProvider]:
+    """Build the configured provider, or None when SMS is disabled"""
+    provider = (SMS_PROVIDER or ("twilio" if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN else "none")).lower()
+    if provider == "twilio":
+        return TwilioSMSProvider(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER)
+    if provider == "local":
+        return LocalSMSProvider(
+            latency_ms=float(os.getenv("SMS_LOCAL_LATENCY_MS", "50")),
+            failure_rate=float(os.getenv("SMS_LOCAL_FAILURE_RATE", "0")),
+        )
+    return None
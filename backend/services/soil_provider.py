@@ -0,0 +1,165 @@
+import json
+import logging
+import math
+import os
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except Exception:
+    np = None  # type: ignore
+
+from models import normalize_region_key
+
+logger = logging.getLogger(__name__)
+
+# Built by jobs/build_soil_grid.py: an .npy array plus a .json sidecar
+SOIL_GRID_PATH = os.getenv("SOIL_GRID_PATH", "data/soil_grid.npy")
+# Points farther than this from every cell fall back to the district lookup
+SOIL_GRID_MAX_DISTANCE_KM = float(os.getenv("SOIL_GRID_MAX_DISTANCE_KM", "50"))
+
+EARTH_RADIUS_KM = 6371.0
+
+# Columns of the grid array, in order; missing values are NaN
+GRID_COLUMNS = (
+    'latitude', 'longitude', 'ph', 'nitrogen', 'phosphorus', 'potassium',
+    'organic_matter', 'moisture', 'temperature', 'soil_type',
+)
+SOIL_FIELDS = GRID_COLUMNS[2:-1]
+
+
+def region_key(state: str, district: str) -> str:
+    return f"{normalize_region_key(state)}|{normalize_region_key(district)}"
+
+
+def metadata_path(grid_path: str) -> str:
+    return os.path.splitext(grid_path)[0] + ".json"
+
+
+class SoilGrid:
+    """Gridded soil properties with nearest-cell and district lookups.
+
+    The array is memory-mapped, so every worker process shares the same
+    pages and only touched cells are read from disk. Cells are indexed in
+    a hash of grid buckets; a nearest-cell query probes the point's bucket
+    and then rings of neighbouring buckets, so it costs a few dict lookups
+    rather than a scan of the grid.
+    """
+
+    def __init__(self, grid_path: str):
+        with open(metadata_path(grid_path)) as f:
+            metadata = json.load(f)
+        self.path = grid_path
+        self.cells = np.load(grid_path, mmap_mode='r')
+        self.soil_types = metadata.get('soil_types', [])
+        self.regions: Dict[str, int] = metadata.get('regions', {})
+        self.resolution = float(metadata.get('resolution', 0.05))
+
+        # Cell indices grouped by bucket; each bucket maps to a slice of _order
+        coords = self.cells[:, :2]
+        valid = np.flatnonzero(~np.isnan(coords).any(axis=1))
+        keys = np.rint(coords[valid] / self.resolution).astype(np.int64)
+        sort = np.lexsort((keys[:, 1], keys[:, 0]))
+        self._order = valid[sort]
+        unique_keys, starts, counts = np.unique(keys[sort], axis=0, return_index=True, return_counts=True)
+        self._buckets: Dict[Tuple[int, int], Tuple[int, int]] = {
+            (int(row), int(col)): (int(start), int(start + count))
+            for (row, col), start, count in zip(unique_keys, starts, counts)
+        }
+
+    def _bucket(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return round(latitude / self.resolution), round(longitude / self.resolution)
+
+    def _distance_km(self, index: int, latitude: float, longitude: float) -> float:
+        lat1, lon1 = math.radians(self.cells[index, 0]), math.radians(self.cells[index, 1])
+        lat2, lon2 = math.radians(latitude), math.radians(longitude)
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def cell(self, index: int) -> Dict[str, Any]:
+        row = self.cells[index]
+        values = {}
+        for field in SOIL_FIELDS:
+            value = float(row[GRID_COLUMNS.index(field)])
+            if not np.isnan(value):
+                values[field] = round(value, 2)
+        soil_type = row[GRID_COLUMNS.index('soil_type')]
+        if not np.isnan(soil_type) and int(soil_type) < len(self.soil_types):
+            values['soil_type'] = self.soil_types[int(soil_type)]
+        return values
+
+    def nearest(self, latitude: float, longitude: float) -> Optional[int]:
+        """Index of the closest cell within SOIL_GRID_MAX_DISTANCE_KM, if any"""
+        if not self._buckets:
+            return None
+        row, col = self._bucket(latitude, longitude)
+        # Smallest bucket width in km at this latitude (longitude shrinks towards the poles)
+        bucket_km = 111.0 * self.resolution * max(math.cos(math.radians(latitude)), 0.01)
+        max_ring = math.ceil(SOIL_GRID_MAX_DISTANCE_KM / bucket_km) + 1
+        best, best_distance = None, SOIL_GRID_MAX_DISTANCE_KM
+        for ring in range(max_ring + 1):
+            for r in range(row - ring, row + ring + 1):
+                for c in range(col - ring, col + ring + 1):
+                    # Only the outline of the ring is new
+                    if ring and abs(r - row) != ring and abs(c - col) != ring:
+                        continue
+                    start, end = self._buckets.get((r, c), (0, 0))
+                    for index in self._order[start:end]:
+                        index = int(index)
+                        distance = self._distance_km(index, latitude, longitude)
+                        if distance <= best_distance:
+                            best, best_distance = index, distance
+            # Every cell in the next ring is at least this far away
+            if best is not None and ring * bucket_km > best_distance:
+                break
+        return best
+
+    def lookup(
+        self, state: str, district: str, latitude: Optional[float] = None, longitude: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Soil values for the nearest cell to a point, else for the district"""
+        index = None
+        if latitude is not None and longitude is not None:
+            index = self.nearest(latitude, longitude)
+        if index is None:
+            index = self.regions.get(region_key(state, district))
+        return None if index is None else self.cell(index)
+
+
+def parse_coordinates(location: str) -> Tuple[Optional[float], Optional[float]]:
+    """Read a "lat,lon" location string; anything else has no coordinates"""
+    parts = location.split(',')
+    if len(parts) != 2:
+        return None, None
+    try:
+        latitude, longitude = float(parts[0]), float(parts[1])
+    except ValueError:
+        return None, None
+    if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+        return latitude, longitude
+    return None, None
+
+
+_grid: Optional[SoilGrid] = None
+_grid_loaded = False
+
+
+def get_soil_grid() -> Optional[SoilGrid]:
+    """The configured soil grid, loaded once per process; None when absent.
+
+    Loaded from a thread at application startup, so the first lookup in a
+    request does not build the index on the event loop.
+    """
+    global _grid, _grid_loaded
+    if not _grid_loaded:
+        _grid_loaded = True
+        if np is not None and os.path.exists(SOIL_GRID_PATH):
+            try:
+                _grid = SoilGrid(SOIL_GRID_PATH)
+                logger.info("Loaded soil grid with %s cells from %s", len(_grid), SOIL_GRID_PATH)
+            except Exception as e:
+                logger.warning("Could not load soil grid %s: %s", SOIL_GRID_PATH, e)
+    return _grid
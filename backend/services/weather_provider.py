@@ -0,0 +1,237 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import run_in_session
+from models import WeatherData, normalize_region_key
+from services.cache import TTLCache
+from services.db_writer import db_writer
+from services.metrics import track_call
+
+logger = logging.getLogger(__name__)
+
+# openweather, fake (deterministic local stand-in) or static (fixed sample
+# values); defaults to openweather when an API key is configured
+WEATHER_PROVIDER = os.getenv("WEATHER_PROVIDER")
+OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
+OPENWEATHER_URL = os.getenv("OPENWEATHER_URL", "https://api.openweathermap.org/data/2.5/weather")
+WEATHER_TIMEOUT_SECONDS = float(os.getenv("WEATHER_TIMEOUT_SECONDS", "5"))
+# Readings are shared by every request for a district within one bucket
+WEATHER_BUCKET_SECONDS = int(os.getenv("WEATHER_BUCKET_SECONDS", "3600"))
+WEATHER_FAKE_LATENCY_MS = float(os.getenv("WEATHER_FAKE_LATENCY_MS", "0"))
+# Fallback values after an upstream failure are cached only briefly
+WEATHER_FAILURE_TTL = float(os.getenv("WEATHER_FAILURE_TTL", "60"))
+
+# Rainfall feeds the crop model as an annual total; current-weather APIs
+# only report recent precipitation, so backends keep this normal
+DEFAULT_ANNUAL_RAINFALL_MM = 950.0
+
+SAMPLE_WEATHER = {
+    'temperature': 26.0,
+    'humidity': 70.0,
+    'rainfall': DEFAULT_ANNUAL_RAINFALL_MM,
+    'wind_speed': 8.5,
+    'pressure': 1012.0,
+    'weather_condition': 'Partly Cloudy'
+}
+
+# Used when the upstream fetch fails
+FALLBACK_WEATHER = {
+    'temperature': 25.0,
+    'humidity': 65.0,
+    'rainfall': 800.0,
+    'wind_speed': 6.0,
+    'pressure': 1010.0,
+    'weather_condition': 'Clear'
+}
+
+WEATHER_FIELDS = ('temperature', 'humidity', 'rainfall', 'wind_speed', 'pressure', 'weather_condition')
+
+
+class WeatherBackend(ABC):
+    name = "base"
+
+    @abstractmethod
+    async def fetch(self, state: str, district: str) -> Dict[str, Any]:
+        """Current readings for a district, keyed by WEATHER_FIELDS"""
+
+
+class StaticWeatherBackend(WeatherBackend):
+    name = "static"
+
+    async def fetch(self, state: str, district: str) -> Dict[str, Any]:
+        return dict(SAMPLE_WEATHER)
+
+
+class FakeWeatherBackend(WeatherBackend):
+    """Deterministic per-district readings for development and load tests.
+
+    ``calls`` counts upstream fetches, which is what the cache and
+    coalescing are meant to minimize.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    async def fetch(self, state: str, district: str) -> Dict[str, Any]:
+        self.calls += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000.0)
+        seed = int(hashlib.sha1(f"{state}|{district}".encode()).hexdigest()[:8], 16)
+        return {
+            'temperature': round(18 + seed % 170 / 10, 1),
+            'humidity': float(40 + seed % 50),
+            'rainfall': float(400 + seed % 1600),
+            'wind_speed': round(seed % 150 / 10, 1),
+            'pressure': float(1000 + seed % 25),
+            'weather_condition': ('Clear', 'Partly Cloudy', 'Cloudy', 'Rain')[seed % 4],
+        }
+
+
+class OpenWeatherBackend(WeatherBackend):
+    name = "openweather"
+
+    def __init__(self, api_key: str, url: str = OPENWEATHER_URL, timeout: float = WEATHER_TIMEOUT_SECONDS):
+        self.api_key = api_key
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _get(self, state: str, district: str) -> Dict[str, Any]:
+        response = self.session.get(
+            self.url,
+            params={'q': f"{district},{state},IN", 'appid': self.api_key, 'units': 'metric'},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def fetch(self, state: str, district: str) -> Dict[str, Any]:
+        payload = await asyncio.to_thread(self._get, state, district)
+        main = payload.get('main', {})
+        conditions = payload.get('weather') or [{}]
+        return {
+            'temperature': main.get('temp', SAMPLE_WEATHER['temperature']),
+            'humidity': main.get('humidity', SAMPLE_WEATHER['humidity']),
+            'rainfall': DEFAULT_ANNUAL_RAINFALL_MM,
+            # m/s -> km/h
+            'wind_speed': round(payload.get('wind', {}).get('speed', 0.0) * 3.6, 1),
+            'pressure': main.get('pressure', SAMPLE_WEATHER['pressure']),
+            'weather_condition': conditions[0].get('main', SAMPLE_WEATHER['weather_condition']),
+        }
+
+
+def get_weather_backend() -> WeatherBackend:
+    provider = (WEATHER_PROVIDER or ("openweather" if OPENWEATHER_API_KEY else "static")).lower()
+    if provider == "openweather" and OPENWEATHER_API_KEY:
+        return OpenWeatherBackend(OPENWEATHER_API_KEY)
+    if provider == "fake":
+        return FakeWeatherBackend(latency_ms=WEATHER_FAKE_LATENCY_MS)
+    return StaticWeatherBackend()
+
+
+def _load_reading(db: Session, location_key: str, bucket_start: datetime) -> Optional[Dict[str, Any]]:
+    row = db.query(WeatherData).filter(
+        WeatherData.location_key == location_key,
+        WeatherData.bucket_start == bucket_start
+    ).first()
+    if row is None:
+        return None
+    return {field: getattr(row, field) for field in WEATHER_FIELDS}
+
+
+def _store_reading(db: Session, location: str, location_key: str, bucket_start: datetime, reading: Dict[str, Any]):
+    db.add(WeatherData(
+        location=location[:100],
+        location_key=location_key,
+        bucket_start=bucket_start,
+        **{field: reading.get(field) for field in WEATHER_FIELDS}
+    ))
+
+
+class WeatherProvider:
+    """District weather behind an in-process cache, a database cache and
+    single-flight upstream fetches.
+
+    Readings are keyed by district and time bucket. Lookups try the
+    in-process cache, then the ``weather_data`` table (shared by all
+    workers), and only then the backend; concurrent misses for the same
+    district await one shared fetch.
+    """
+
+    def __init__(self, backend: WeatherBackend, bucket_seconds: int = WEATHER_BUCKET_SECONDS):
+        self.backend = backend
+        self.bucket_seconds = bucket_seconds
+        self.upstream_fetches = 0
+        self._cache = TTLCache(maxsize=8192, ttl=bucket_seconds, name="weather")
+        self._inflight: Dict[Tuple[str, int], asyncio.Future] = {}
+
+    def _bucket(self) -> int:
+        return int(time.time() // self.bucket_seconds)
+
+    async def get(self, location: str, state: str, district: str) -> Dict[str, Any]:
+        location_key = f"{normalize_region_key(state)}|{normalize_region_key(district)}"
+        key = (location_key, self._bucket())
+        reading = self._cache.get(key)
+        if reading is not None:
+            return dict(reading)
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            try:
+                reading, ttl = await self._load(location, state, district, location_key, key[1])
+                self._cache.set(key, reading, ttl=ttl)
+                future.set_result(reading)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                # Mark retrieved; waiters (if any) see it, the leader re-raises
+                future.exception()
+                raise
+            finally:
+                del self._inflight[key]
+            return dict(reading)
+        return dict(await asyncio.shield(future))
+
+    async def _load(
+        self, location: str, state: str, district: str, location_key: str, bucket: int
+    ) -> Tuple[Dict[str, Any], Optional[float]]:
+        """Reading for a bucket and how long to cache it in-process"""
+        bucket_start = datetime.fromtimestamp(bucket * self.bucket_seconds)
+        reading = await run_in_session(_load_reading, location_key, bucket_start)
+        if reading is not None:
+            return reading, None
+
+        try:
+            self.upstream_fetches += 1
+            with track_call(f"weather_{self.backend.name}"):
+                reading = await self.backend.fetch(state, district)
+        except Exception as e:
+            # Not cached in the database, so the next bucket retries upstream
+            logger.warning("Weather fetch for %s failed: %s", location_key, e)
+            return dict(FALLBACK_WEATHER), WEATHER_FAILURE_TTL
+        try:
+            await db_writer.run(_store_reading, location, location_key, bucket_start, reading)
+        except IntegrityError:
+            # Another worker stored this bucket first
+            pass
+        return reading, None
+
+
+weather_provider = WeatherProvider(get_weather_backend())